@@ -0,0 +1,199 @@
+"""
+Аналітика парку станцій, що розраховується один раз на версію даних
+Поєднує метадані станцій (потужність, пара) з виробітком:
+  - питомий виробіток (кВт·год/кВт) та коефіцієнт використання потужності
+    по станціях за місяці, роки та весь період;
+  - порівняння станцій у парах (A/B) за тими ж періодами;
+  - прапорці недовиробітку: ковзне вікно питомого виробітку станції
+    проти медіани пари (або парку, якщо пари немає).
+Усі суми беруться з кумулятивних сум сховища, тобто O(1) на період/день.
+"""
+import os
+from statistics import median
+
+# Періоди агрегації аналітики ('all' - весь доступний період)
+ANALYTICS_BUCKETS = ('month', 'year', 'all')
+
+# Ковзне вікно для пошуку недовиробітку, днів
+ANOMALY_WINDOW = int(os.getenv('ANOMALY_WINDOW', '7'))
+
+# Поріг: питомий виробіток за вікно нижче цієї частки від медіани пари/парку
+ANOMALY_THRESHOLD = float(os.getenv('ANOMALY_THRESHOLD', '0.8'))
+
+
+def _round(value, digits):
+    return round(value, digits) if value is not None else None
+
+
+def _period_metrics(kwh, days, capacity_kw):
+    """Питомий виробіток (кВт·год/кВт) та КВВП за період з days днями даних"""
+    if not days or not capacity_kw:
+        return None, None
+    specific_yield = kwh / capacity_kw
+    return specific_yield, specific_yield / (24 * days)
+
+
+def _station_periods(store, station_id, capacity_kw, bucket):
+    """Показники станції по інтервалах bucket (month / year / all)"""
+    if bucket == 'all':
+        if not store.dates:
+            return []
+        kwh, days = store.total([station_id])
+        periods = [('all', 0, len(store.dates), kwh, days)]
+    else:
+        periods = store.bucket_totals([station_id], bucket)
+
+    result = []
+    for period, lo, hi, kwh, days in periods:
+        specific_yield, capacity_factor = _period_metrics(kwh, days, capacity_kw)
+        result.append({
+            'period': period,
+            'start': store.dates[lo],
+            'end': store.dates[hi - 1],
+            'energy_kwh': round(kwh, 2),
+            'days': days,
+            'specific_yield': _round(specific_yield, 3),
+            'capacity_factor': _round(capacity_factor, 4)
+        })
+    return result
+
+
+def _pair_periods(members, station_periods):
+    """Порівняння станцій пари: питомий виробіток та відхилення від середнього пари, %"""
+    by_period = {}
+    for station_id in members:
+        for record in station_periods[station_id]:
+            if record['specific_yield'] is not None:
+                by_period.setdefault(record['period'], (record, {}))[1][station_id] = record['specific_yield']
+
+    result = []
+    for period, (record, yields) in by_period.items():
+        if len(yields) < 2:
+            continue
+        mean = sum(yields.values()) / len(yields)
+        item = {
+            'period': period,
+            'start': record['start'],
+            'end': record['end'],
+            'specific_yield': yields,
+            'deviation_pct': {
+                station_id: round((value - mean) / mean * 100, 2) if mean else None
+                for station_id, value in yields.items()
+            }
+        }
+        if len(members) == 2 and len(yields) == 2:
+            # Класична пара A/B: різниця першої станції відносно другої
+            first, second = yields[members[0]], yields[members[1]]
+            item['delta_pct'] = round((first - second) / second * 100, 2) if second else None
+        result.append(item)
+    return sorted(result, key=lambda item: item['start'])
+
+
+def _rolling_yield(store, station_id, capacity_kw, window):
+    """Питомий виробіток за ковзне вікно, що закінчується кожним днем (None - мало даних)"""
+    sums, counts = store.prefix(station_id)
+    n = len(store.dates)
+    min_days = window // 2 + 1
+    result = [None] * n
+    if not capacity_kw:
+        return result
+    for i in range(window - 1, n):
+        days = counts[i + 1] - counts[i + 1 - window]
+        if days >= min_days:
+            result[i] = (sums[i + 1] - sums[i + 1 - window]) / (capacity_kw * days)
+    return result
+
+
+def _anomalies(store, stations, rolling, pairs):
+    """
+    Періоди недовиробітку: дні поспіль, коли ковзний питомий виробіток станції
+    менший за ANOMALY_THRESHOLD від медіани інших станцій пари (або всього парку)
+    """
+    n = len(store.dates)
+    fleet = [
+        median(values) if values else None
+        for values in ([r[i] for r in rolling.values() if r[i] is not None] for i in range(n))
+    ]
+
+    events = []
+    for station in stations:
+        station_id = station['station_id']
+        own = rolling[station_id]
+        peers = [rolling[sid] for sid in pairs.get(station['station_pair'], ()) if sid != station_id]
+
+        run = None
+        for i in range(n + 1):
+            ratio = None
+            if i < n and own[i] is not None:
+                peer_values = [p[i] for p in peers if p[i] is not None]
+                reference = median(peer_values) if peer_values else fleet[i]
+                if reference:
+                    ratio = own[i] / reference
+
+            if ratio is not None and ratio < ANOMALY_THRESHOLD:
+                if run is None:
+                    run = {'lo': i, 'ratios': []}
+                run['ratios'].append(ratio)
+            elif run is not None:
+                events.append({
+                    'station_id': station_id,
+                    'station_name': station['station_name'],
+                    'station_pair': station['station_pair'],
+                    'start': store.dates[run['lo']],
+                    'end': store.dates[i - 1],
+                    'days': i - run['lo'],
+                    'mean_ratio': round(sum(run['ratios']) / len(run['ratios']), 3),
+                    'min_ratio': round(min(run['ratios']), 3),
+                    'active': i == n
+                })
+                run = None
+
+    return sorted(events, key=lambda event: (event['start'], event['station_id']), reverse=True)
+
+
+def compute_analytics(stations, store):
+    """
+    Розраховує всю аналітику для знімка даних
+    Повертає {'stations': {bucket: {station_id: [...]}}, 'pairs': {bucket: {pair: {...}}}, 'anomalies': [...]}
+    """
+    known = [s for s in stations if s['station_id'] in store.series]
+    capacity = {s['station_id']: s.get('total_capacity_kw') or 0.0 for s in known}
+
+    pairs = {}
+    for station in known:
+        if station.get('station_pair'):
+            pairs.setdefault(station['station_pair'], []).append(station['station_id'])
+
+    station_periods = {}
+    pair_periods = {}
+    for bucket in ANALYTICS_BUCKETS:
+        station_periods[bucket] = {
+            station_id: _station_periods(store, station_id, capacity[station_id], bucket)
+            for station_id in capacity
+        }
+        pair_periods[bucket] = {
+            pair: {'station_ids': members, 'periods': _pair_periods(members, station_periods[bucket])}
+            for pair, members in pairs.items()
+            if len(members) >= 2
+        }
+
+    rolling = {
+        station_id: _rolling_yield(store, station_id, capacity[station_id], ANOMALY_WINDOW)
+        for station_id in capacity
+    }
+
+    return {
+        'stations': station_periods,
+        'pairs': pair_periods,
+        'anomalies': _anomalies(store, known, rolling, pairs),
+        'anomaly_window': ANOMALY_WINDOW,
+        'anomaly_threshold': ANOMALY_THRESHOLD
+    }
+
+
+def filter_periods(periods, start_date=None, end_date=None):
+    """Періоди, що перетинаються з [start_date, end_date] (рядки 'YYYY-MM-DD' або None)"""
+    return [
+        period for period in periods
+        if (not start_date or period['end'] >= start_date) and (not end_date or period['start'] <= end_date)
+    ]
@@ -1,14 +1,16 @@
 """
 Веб-додаток для моніторингу сонячних електростанцій
 """
-from flask import Flask, render_template, jsonify, request, send_file
-from data_parser import get_all_stations, get_station_by_id, get_statistics, get_production_data, get_available_date_range
+from flask import Flask, Response, render_template, jsonify, request
+from data_parser import get_all_stations, get_station_by_id, get_statistics, get_production_data, get_production_columns, get_available_date_range, get_production_summary, get_production_delta, find_stations, get_station_analytics, get_pair_analytics, get_anomalies, get_snapshot, get_data_version, wait_for_data_change, get_sources_status, get_intraday_data, INTRADAY_RESOLUTIONS
+from response_cache import cached_response
+import metrics
+import scheduler
+from station_registry import INDEXED_FIELDS
+from report_export import iter_report_rows, remove_file, stream_csv, stream_file, write_xlsx_report
 from datetime import datetime, timedelta
-import io
-import csv
-import threading
 import time
-import requests
+import json
 import os
 
 app = Flask(__name__, 
@@ -17,6 +19,21 @@ app = Flask(__name__,
 
 app.config['JSON_AS_ASCII'] = False
 
+metrics.init_app(app)
+
+# Під gunicorn (без запуску через __main__) планувальник вмикається змінною SCHEDULER_AUTOSTART;
+# з --preload він стартує в майстер-процесі та перезапускається в кожному воркері після fork
+if os.environ.get('SCHEDULER_AUTOSTART', '').lower() in ('1', 'true', 'yes'):
+    scheduler.start(app)
+
+# Потік подій /api/stream: інтервал keep-alive та тривалість одного з'єднання, секунд
+# (після закриття браузер перепідключається сам, тож воркер не зайнятий назавжди).
+# Кожне з'єднання тримає воркер, тому потік вмикається лише явно (SSE_ENABLED=1)
+# для потокових / gevent воркерів; сторінка графіків опитує /api/production/delta
+SSE_ENABLED = os.environ.get('SSE_ENABLED', '0') == '1'
+SSE_HEARTBEAT = 15
+SSE_STREAM_SECONDS = int(os.environ.get('SSE_STREAM_SECONDS', 300))
+
 @app.route('/')
 def index():
     """Головна сторінка з цікавим контентом"""
@@ -32,10 +49,60 @@ def charts():
     """Сторінка з графіками"""
     return render_template('charts.html')
 
+def _valid_point(latitude, longitude):
+    """Чи є пара значень допустимими координатами"""
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
 @app.route('/api/stations')
+@cached_response(get_data_version)
 def api_stations():
-    """API: список всіх станцій"""
-    stations = get_all_stations()
+    """
+    API: список станцій
+    Фільтри (необов'язкові): station_pair, location, inverter_brand, monitoring_system
+    (кілька значень - повтором параметра, бо назви розташувань містять коми), bbox=min_lat,min_lon,max_lat,max_lon,
+    near=lat,lon з limit та max_km - найближчі станції з distance_km
+    """
+    filters = {
+        field: [value.strip() for value in request.args.getlist(field) if value.strip()]
+        for field in INDEXED_FIELDS if request.args.get(field)
+    }
+    
+    try:
+        bbox = near = limit = max_km = None
+        if request.args.get('bbox'):
+            bbox = [float(value) for value in request.args['bbox'].split(',')]
+            if len(bbox) != 4 or not _valid_point(bbox[0], bbox[1]) or not _valid_point(bbox[2], bbox[3]):
+                raise ValueError
+        if request.args.get('near'):
+            near = [float(value) for value in request.args['near'].split(',')]
+            if len(near) != 2 or not _valid_point(near[0], near[1]):
+                raise ValueError
+        if request.args.get('limit'):
+            limit = int(request.args['limit'])
+            if limit < 1:
+                raise ValueError
+        if request.args.get('max_km'):
+            max_km = float(request.args['max_km'])
+            # Обмеження відстані має сенс лише для пошуку найближчих (near)
+            if not max_km > 0 or near is None:
+                raise ValueError
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Невірні параметри фільтра (bbox, near, limit, max_km)'
+        }), 400
+    
+    if filters or bbox or near or limit:
+        try:
+            stations = find_stations(filters, bbox, near, limit, max_km)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    else:
+        stations = get_all_stations()
+    
     return jsonify({
         'success': True,
         'count': len(stations),
@@ -43,6 +110,7 @@ def api_stations():
     })
 
 @app.route('/api/station/<station_id>')
+@cached_response(get_data_version)
 def api_station(station_id):
     """API: дані конкретної станції"""
     station = get_station_by_id(station_id)
@@ -57,7 +125,14 @@ def api_station(station_id):
             'error': 'Станція не знайдена'
         }), 404
 
+def _default_period_key():
+    """Поточна дата, якщо період /api/production береться від неї (без start_date або end_date)"""
+    if request.args.get('start_date') and request.args.get('end_date'):
+        return None
+    return datetime.now().strftime('%Y-%m-%d')
+
 @app.route('/api/production')
+@cached_response(get_data_version, key_extra=_default_period_key)
 def api_production():
     """API: дані виробітку для станцій за період"""
     station_ids = request.args.get('stations', '').split(',')
@@ -83,22 +158,249 @@ def api_production():
             'error': 'Невірний формат дати'
         }), 400
     
+    # Роздільна здатність (day / week / month або внутрішньодобові 15min / hour)
+    # та обмеження кількості точок на станцію
+    resolution = request.args.get('resolution', 'day')
+    try:
+        max_points = int(request.args.get('max_points', 0)) or None
+        if max_points is not None and max_points < 3:
+            raise ValueError
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'max_points має бути цілим числом не менше 3'
+        }), 400
+    
+    # Формат відповіді: records - список записів на станцію, columnar - вісь дат
+    # і вирівняні масиви значень, msgpack - колонковий формат у MessagePack
+    data_format = request.args.get('format', 'records')
+    if data_format not in ('records', 'columnar', 'msgpack'):
+        return jsonify({
+            'success': False,
+            'error': 'Невідомий формат даних'
+        }), 400
+    
     # Отримання даних
     if not station_ids:
         station_ids = None
     
-    production_data = get_production_data(station_ids, start_date, end_date)
+    # Версія читається до даних: дані не старші за неї, тож дельта від неї нічого не пропустить
+    version = get_data_version()[0]
+    try:
+        if resolution in INTRADAY_RESOLUTIONS:
+            production_data = get_intraday_data(
+                station_ids, start_date, end_date, resolution, max_points, columnar=data_format != 'records'
+            )
+        elif data_format == 'records':
+            production_data = get_production_data(station_ids, start_date, end_date, resolution, max_points)
+        else:
+            production_data = get_production_columns(station_ids, start_date, end_date, resolution, max_points)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     
-    return jsonify({
+    payload = {
         'success': True,
+        'format': data_format,
         'data': production_data,
+        'version': version,
+        'resolution': resolution,
         'period': {
             'start': start_date.strftime('%Y-%m-%d'),
             'end': end_date.strftime('%Y-%m-%d')
         }
+    }
+    
+    if data_format == 'msgpack':
+        try:
+            import msgpack
+        except ImportError:
+            return jsonify({
+                'success': False,
+                'error': 'Формат msgpack недоступний (не встановлено пакет msgpack)'
+            }), 400
+        # float32 достатньо для кВт·год і вдвічі компактніше
+        return Response(msgpack.packb(payload, use_single_float=True), mimetype='application/x-msgpack')
+    
+    return jsonify(payload)
+
+@app.route('/api/production/delta')
+@cached_response(get_data_version)
+def api_production_delta():
+    """API: денні дані, додані або змінені після версії since"""
+    since = request.args.get('since')
+    if not since:
+        return jsonify({
+            'success': False,
+            'error': 'Не вказано версію since'
+        }), 400
+    
+    station_ids = request.args.get('stations', '').split(',')
+    station_ids = [sid.strip() for sid in station_ids if sid.strip()] or None
+    
+    start_date_str = request.args.get('start_date')
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Невірний формат дати'
+        }), 400
+    
+    delta = get_production_delta(since, station_ids, start_date)
+    return jsonify({
+        'success': True,
+        **delta,
+        **get_available_date_range()
+    })
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events: подія version при кожній новій версії даних"""
+    if not SSE_ENABLED:
+        return jsonify({
+            'success': False,
+            'error': 'Потік подій вимкнено (SSE_ENABLED)'
+        }), 404
+    
+    def events():
+        yield 'retry: 5000\n\n'
+        version = None
+        deadline = time.time() + SSE_STREAM_SECONDS
+        while time.time() < deadline:
+            # get_snapshot() також запускає фонове оновлення застарілого знімка
+            snapshot = get_snapshot()
+            if snapshot['version'] != version:
+                version = snapshot['version']
+                payload = json.dumps({'version': version, 'synced_at': snapshot['synced_at']})
+                yield f'event: version\ndata: {payload}\n\n'
+            else:
+                yield ': keep-alive\n\n'
+            wait_for_data_change(version, min(SSE_HEARTBEAT, max(deadline - time.time(), 0)))
+    
+    return Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/production/summary')
+@cached_response(get_data_version)
+def api_production_summary():
+    """API: зведення виробітку (суми та середні) по станціях, парах, регіонах або всьому парку"""
+    station_ids = request.args.get('stations', '').split(',')
+    station_ids = [sid.strip() for sid in station_ids if sid.strip()] or None
+    
+    group_by = request.args.get('group_by', 'station')
+    bucket = request.args.get('bucket') or None
+    
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    
+    # Парсинг дат (без дат - весь доступний період)
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Невірний формат дати'
+        }), 400
+    
+    try:
+        summary = get_production_summary(group_by, bucket, station_ids, start_date, end_date)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'group_by': group_by,
+        'bucket': bucket,
+        'groups': summary
+    })
+
+def _analytics_params():
+    """
+    Спільні параметри /api/analytics/*: (станції, дата початку, дата кінця)
+    Невірна дата - ValueError з повідомленням для клієнта
+    """
+    station_ids = request.args.get('stations', '').split(',')
+    station_ids = [sid.strip() for sid in station_ids if sid.strip()] or None
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+    except ValueError:
+        raise ValueError('Невірний формат дати') from None
+    return station_ids, start_date, end_date
+
+@app.route('/api/analytics/stations')
+@cached_response(get_data_version)
+def api_analytics_stations():
+    """API: питомий виробіток та КВВП станцій по місяцях / роках / за весь період"""
+    bucket = request.args.get('bucket', 'month')
+    try:
+        station_ids, start_date, end_date = _analytics_params()
+        data = get_station_analytics(bucket, station_ids, start_date, end_date)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'bucket': bucket,
+        'stations': data
+    })
+
+@app.route('/api/analytics/pairs')
+@cached_response(get_data_version)
+def api_analytics_pairs():
+    """API: порівняння станцій у парах A/B по періодах"""
+    bucket = request.args.get('bucket', 'month')
+    pairs = [pair.strip() for pair in request.args.get('pairs', '').split(',') if pair.strip()] or None
+    try:
+        _, start_date, end_date = _analytics_params()
+        data = get_pair_analytics(bucket, pairs, start_date, end_date)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'bucket': bucket,
+        'pairs': data
+    })
+
+@app.route('/api/analytics/anomalies')
+@cached_response(get_data_version)
+def api_analytics_anomalies():
+    """API: періоди недовиробітку (active=1 - лише ті, що тривають зараз)"""
+    active_only = request.args.get('active', '') in ('1', 'true')
+    try:
+        station_ids, start_date, _ = _analytics_params()
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Невірний формат дати'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        **get_anomalies(station_ids, start_date, active_only)
     })
 
 @app.route('/api/date-range')
+@cached_response(get_data_version)
 def api_date_range():
     """API: доступний діапазон дат"""
     date_range = get_available_date_range()
@@ -108,6 +410,7 @@ def api_date_range():
     })
 
 @app.route('/api/statistics')
+@cached_response(get_data_version)
 def api_statistics():
     """API: загальна статистика"""
     stats = get_statistics()
@@ -116,14 +419,23 @@ def api_statistics():
         **stats
     })
 
+@app.route('/api/sources')
+def api_sources():
+    """API: стан джерел даних (таблиць Google Sheets) та конфлікти ID станцій"""
+    return jsonify({
+        'success': True,
+        **get_sources_status()
+    })
+
 @app.route('/api/export/excel')
 def export_excel():
-    """Експорт даних у Excel (CSV)"""
+    """Експорт даних у Excel (format=xlsx) або CSV (за замовчуванням) з потоковою віддачею"""
     station_ids = request.args.get('stations', '').split(',')
     station_ids = [sid.strip() for sid in station_ids if sid.strip()]
     
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
+    export_format = request.args.get('format', 'csv')
     
     try:
         if start_date_str:
@@ -141,72 +453,49 @@ def export_excel():
     if not station_ids:
         return jsonify({'error': 'Не вказано станції'}), 400
     
-    # Отримання даних
-    production_data = get_production_data(station_ids, start_date, end_date)
-    stations = get_all_stations()
-    station_map = {s['station_id']: s for s in stations}
-    
-    # Створення CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Заголовок
-    writer.writerow(['Звіт виробітку сонячних електростанцій'])
-    writer.writerow([f'Період: {start_date.strftime("%d.%m.%Y")} - {end_date.strftime("%d.%m.%Y")}'])
-    writer.writerow([])
-    
-    for station_id in station_ids:
-        if station_id not in production_data or station_id not in station_map:
-            continue
-        
-        station = station_map[station_id]
-        data = production_data[station_id]
-        
-        # Дані станції
-        writer.writerow([f'{station["station_name"]} - {station["location"]}'])
-        writer.writerow(['Потужність (кВт)', station['total_capacity_kw']])
-        writer.writerow([])
-        
-        # Таблиця даних
-        writer.writerow(['Дата', 'Виробництво (кВт·год)'])
-        
-        total_production = 0
-        for entry in data:
-            writer.writerow([entry['date'], entry['production_kwh']])
-            total_production += entry['production_kwh']
-        
-        writer.writerow(['ЗАГАЛОМ:', total_production])
-        writer.writerow([])
-        writer.writerow([])
-    
-    # Повернення файлу
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8-sig')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'ses_report_{datetime.now().strftime("%Y%m%d")}.csv'
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': 'Невідомий формат експорту'}), 400
+    
+    # Один знімок на весь звіт, щоб дані не змінились під час віддачі
+    snapshot = get_snapshot()
+    store = snapshot['store']
+    stations = snapshot['stations']
+    download_name = f'ses_report_{datetime.now().strftime("%Y%m%d")}.{export_format}'
+    
+    path = None
+    if export_format == 'xlsx':
+        path = write_xlsx_report(store, stations, station_ids, start_date, end_date)
+        body = stream_file(path)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = stream_csv(iter_report_rows(store, stations, station_ids, start_date, end_date))
+        mimetype = 'text/csv'
+    
+    response = Response(
+        body,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={download_name}'}
     )
+    if path:
+        response.call_on_close(lambda: remove_file(path))
+    return response
 
-def self_ping(url):
-    print(f"Запущено селф-пінг для: {url}")
-    while True:
-        try:
-            # Виконуємо запит
-            response = requests.get(url)
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Пінг успішний: {response.status_code}")
-        except Exception as e:
-            print(f"Помилка пінгу: {e}")
-        
-        # Чекаємо 5 хвилин (300 секунд)
-        time.sleep(300)
+@app.route('/api/scheduler/status')
+def api_scheduler_status():
+    """API: стан фонового планувальника (оновлення даних, прогрів кешу, keep-alive)"""
+    return jsonify({
+        'success': True,
+        **scheduler.status()
+    })
+
+@app.route('/metrics')
+def api_metrics():
+    """Метрики у текстовому форматі Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    TARGET_URL = "https://tsatu-monitoring-88qr.onrender.com"
-    
-    ping_thread = threading.Thread(target=self_ping, args=(TARGET_URL,), daemon=True)
-    ping_thread.start()
+    # Фонове оновлення даних, прогрів кешу та keep-alive пінги
+    scheduler.start(app)
 
     port = int(os.environ.get("PORT", 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
-
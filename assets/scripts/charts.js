@@ -6,6 +6,23 @@ let currentPeriod = 30;
 let customDateRange = null;
 let availableDateRange = null;
 
+// Дані, показані на графіку, та їх версія (для дозавантаження змін)
+let chartState = null;
+let dataVersion = null;
+
+// Максимальна кількість точок на станцію (більші періоди агрегуються на сервері)
+const MAX_CHART_POINTS = 400;
+
+// Інтервал перевірки нових даних, мс
+const UPDATE_POLL_INTERVAL = 60000;
+
+// Назви інтервалів агрегації
+const RESOLUTION_LABELS = {
+    day: 'день',
+    week: 'тиждень',
+    month: 'місяць'
+};
+
 // Кольори для графіків
 const CHART_COLORS = [
     '#4a90e2', '#50c878', '#f39c12', '#e74c3c', '#9b59b6',
@@ -22,6 +39,7 @@ document.addEventListener('DOMContentLoaded', () => {
     setupCustomDateRange();
     setupExportButtons();
     initializeChart();
+    subscribeToUpdates();
 });
 
 // Завантаження доступного діапазону дат
@@ -75,6 +93,19 @@ function calculateStartDate(days) {
     return startDate.toISOString().split('T')[0];
 }
 
+// Вибір інтервалу агрегації, щоб кількість точок не перевищувала MAX_CHART_POINTS
+function chooseResolution(startDate, endDate) {
+    const days = (new Date(endDate) - new Date(startDate)) / 86400000 + 1;
+    
+    if (days <= MAX_CHART_POINTS) {
+        return 'day';
+    }
+    if (days / 7 <= MAX_CHART_POINTS) {
+        return 'week';
+    }
+    return 'month';
+}
+
 // Завантаження списку станцій
 async function loadStationsList() {
     try {
@@ -124,6 +155,7 @@ function selectAllStations() {
 // Очистити вибір
 function clearAllStations() {
     selectedStations = [];
+    chartState = null;
     updateCheckboxes();
     clearChart();
     updateExportButtons();
@@ -185,13 +217,22 @@ async function loadProductionData() {
             startDate = calculateStartDate(currentPeriod);
         }
         
-        // Запит даних
+        // Запит даних (довгі періоди агрегуються на сервері); колонковий формат -
+        // спільна вісь дат і вирівняні з нею масиви значень станцій
         const stationsParam = selectedStations.join(',');
-        const response = await fetch(`/api/production?stations=${stationsParam}&start_date=${startDate}&end_date=${endDate}`);
+        const resolution = chooseResolution(startDate, endDate);
+        const response = await fetch(`/api/production?stations=${stationsParam}&start_date=${startDate}&end_date=${endDate}&resolution=${resolution}&max_points=${MAX_CHART_POINTS}&format=columnar`);
         const data = await response.json();
         
         if (data.success) {
-            chartInfo.innerHTML = `<p><i class="fas fa-check-circle"></i> Вибрано станцій: ${selectedStations.length} | Період: ${data.period.start} - ${data.period.end}</p>`;
+            chartState = {
+                data: data.data,
+                resolution: data.resolution,
+                start: data.period.start,
+                end: data.period.end
+            };
+            dataVersion = data.version;
+            updateChartInfo();
             updateChart(data.data);
         } else {
             chartInfo.innerHTML = '<p><i class="fas fa-exclamation-triangle"></i> Помилка завантаження даних</p>';
@@ -202,29 +243,112 @@ async function loadProductionData() {
     }
 }
 
-// Оновлення графіка
-function updateChart(productionData) {
-    // Збір всіх унікальних дат
-    const allDates = new Set();
-    Object.values(productionData).forEach(stationData => {
-        stationData.forEach(entry => allDates.add(entry.date));
+// Рядок інформації під графіком
+function updateChartInfo() {
+    document.getElementById('chart-info').innerHTML = `<p><i class="fas fa-check-circle"></i> Вибрано станцій: ${selectedStations.length} | Період: ${chartState.start} - ${chartState.end} | Інтервал: ${RESOLUTION_LABELS[chartState.resolution]}</p>`;
+}
+
+// Періодична перевірка нових даних (лише поки вкладка видима)
+// Запит delta кешується на сервері, а з cache: 'no-cache' браузер надсилає If-None-Match,
+// тож поки версія не змінилась, відповідь - порожній 304
+function subscribeToUpdates() {
+    setInterval(() => {
+        if (!document.hidden) {
+            applyDataUpdate();
+        }
+    }, UPDATE_POLL_INTERVAL);
+}
+
+// Дозавантаження змін після нової синхронізації
+async function applyDataUpdate() {
+    if (!chartState || !dataVersion || selectedStations.length === 0) {
+        return;
+    }
+    
+    try {
+        const stationsParam = selectedStations.join(',');
+        const response = await fetch(`/api/production/delta?since=${dataVersion}&stations=${stationsParam}&start_date=${chartState.start}`, { cache: 'no-cache' });
+        const delta = await response.json();
+        
+        if (!delta.success || delta.version === dataVersion) {
+            return;
+        }
+        
+        // Агреговані дані (тижні / місяці) та невідома версія - повне перезавантаження
+        if (delta.full_reload || chartState.resolution !== 'day') {
+            availableDateRange = {
+                min: delta.min_date,
+                max: delta.max_date
+            };
+            loadProductionData();
+            return;
+        }
+        
+        // Період "останні N днів" зсувається разом з новою останньою датою
+        if (!customDateRange && delta.max_date > availableDateRange.max) {
+            availableDateRange.max = delta.max_date;
+            chartState.end = delta.max_date;
+            chartState.start = calculateStartDate(currentPeriod);
+            document.getElementById('end-date').value = chartState.end;
+            document.getElementById('start-date').value = chartState.start;
+        }
+        
+        chartState.data = mergeDelta(chartState.data, delta.data, chartState.start, chartState.end);
+        
+        dataVersion = delta.version;
+        updateChartInfo();
+        updateChart(chartState.data);
+    } catch (error) {
+        console.error('Помилка оновлення даних:', error);
+    }
+}
+
+// Застосування змін з /api/production/delta до колонкових даних графіка
+// (нові та оновлені дні замінюють старі, null - видалені; поза періодом - відкидаються)
+function mergeDelta(columns, changes, start, end) {
+    const rows = {};
+    columns.dates.forEach((date, i) => {
+        rows[date] = {};
+        Object.entries(columns.series).forEach(([stationId, values]) => {
+            if (values[i] !== null) {
+                rows[date][stationId] = values[i];
+            }
+        });
     });
     
-    const sortedDates = Array.from(allDates).sort();
+    Object.entries(changes).forEach(([stationId, entries]) => {
+        entries.forEach(entry => {
+            const row = rows[entry.date] || (rows[entry.date] = {});
+            if (entry.production_kwh === null) {
+                delete row[stationId];
+            } else {
+                row[stationId] = entry.production_kwh;
+            }
+        });
+    });
+    
+    const dates = Object.keys(rows).sort().filter(
+        date => date >= start && date <= end && Object.keys(rows[date]).length > 0
+    );
+    const series = {};
+    Object.keys(columns.series).forEach(stationId => {
+        series[stationId] = dates.map(date => rows[date][stationId] ?? null);
+    });
+    
+    return { dates: dates, series: series };
+}
+
+// Оновлення графіка (columns - {dates, series} з /api/production?format=columnar)
+function updateChart(columns) {
+    const sortedDates = columns.dates;
     
     // Підготовка datasets для кожної станції
     const datasets = selectedStations.map((stationId, index) => {
         const station = allStations.find(s => s.station_id === stationId);
-        const stationData = productionData[stationId] || [];
-        
-        // Створення мапи дата -> виробництво
-        const dataMap = {};
-        stationData.forEach(entry => {
-            dataMap[entry.date] = entry.production_kwh;
-        });
+        const values = columns.series[stationId] || [];
         
-        // Масив даних для графіка
-        const chartData = sortedDates.map(date => dataMap[date] || 0);
+        // Масив даних для графіка (дні без даних - 0)
+        const chartData = sortedDates.map((date, i) => values[i] || 0);
         
         return {
             label: station ? station.station_name : stationId,
@@ -399,41 +523,40 @@ function setupCustomDateRange() {
 
 // Налаштування кнопок експорту
 function setupExportButtons() {
-    const exportExcelBtn = document.getElementById('export-excel');
+    document.getElementById('export-excel').addEventListener('click', () => exportReport('xlsx'));
+    document.getElementById('export-csv').addEventListener('click', () => exportReport('csv'));
+}
+
+// Експорт звіту у вибраному форматі (xlsx або csv)
+function exportReport(format) {
+    if (selectedStations.length === 0) {
+        alert('Будь ласка, виберіть хоча б одну станцію');
+        return;
+    }
     
-    exportExcelBtn.addEventListener('click', () => {
-        if (selectedStations.length === 0) {
-            alert('Будь ласка, виберіть хоча б одну станцію');
-            return;
-        }
-        
-        // Визначення періоду
-        let startDate, endDate;
-        
-        if (customDateRange) {
-            startDate = customDateRange.start;
-            endDate = customDateRange.end;
-        } else {
-            endDate = availableDateRange.max;
-            startDate = calculateStartDate(currentPeriod);
-        }
-        
-        // Формування URL для експорту
-        const stationsParam = selectedStations.join(',');
-        const url = `/api/export/excel?stations=${stationsParam}&start_date=${startDate}&end_date=${endDate}`;
-        
-        // Завантаження файлу
-        window.location.href = url;
-    });
+    // Визначення періоду
+    let startDate, endDate;
+    
+    if (customDateRange) {
+        startDate = customDateRange.start;
+        endDate = customDateRange.end;
+    } else {
+        endDate = availableDateRange.max;
+        startDate = calculateStartDate(currentPeriod);
+    }
+    
+    // Формування URL для експорту
+    const stationsParam = selectedStations.join(',');
+    const url = `/api/export/excel?stations=${stationsParam}&start_date=${startDate}&end_date=${endDate}&format=${format}`;
+    
+    // Завантаження файлу
+    window.location.href = url;
 }
 
 // Оновлення стану кнопок експорту
 function updateExportButtons() {
-    const exportExcelBtn = document.getElementById('export-excel');
+    const disabled = selectedStations.length === 0;
     
-    if (selectedStations.length > 0) {
-        exportExcelBtn.disabled = false;
-    } else {
-        exportExcelBtn.disabled = true;
-    }
+    document.getElementById('export-excel').disabled = disabled;
+    document.getElementById('export-csv').disabled = disabled;
 }
@@ -0,0 +1,113 @@
+"""
+Наскрізне навантажувальне тестування HTTP API
+Додаток працює з локальним замінником Google Sheets (fake_sheets_server) на
+синтетичній таблиці; для кожного ендпоінту рахуються p50/p95/p99 затримки
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_sheets_server import FakeSheetsServer
+from synthetic import make_sheets
+
+
+def _endpoints(station_ids, min_date, max_date):
+    """Типові запити сторінок додатку"""
+    stations = ','.join(station_ids)
+    return {
+        'stations': '/api/stations',
+        'statistics': '/api/statistics',
+        'date_range': '/api/date-range',
+        'production_30d': f'/api/production?stations={stations}&start_date={max_date[:8]}01&end_date={max_date}',
+        'production_all_week': (
+            f'/api/production?stations={stations}&start_date={min_date}&end_date={max_date}'
+            f'&resolution=week&max_points=400'
+        ),
+        'production_all_week_columnar': (
+            f'/api/production?stations={stations}&start_date={min_date}&end_date={max_date}'
+            f'&resolution=week&max_points=400&format=columnar'
+        ),
+        'summary_pair_month': '/api/production/summary?group_by=pair&bucket=month',
+        'export_csv': f'/api/export/excel?stations={stations}&start_date={min_date}&end_date={max_date}'
+    }
+
+
+def percentiles(samples):
+    """p50 / p95 / p99 / max у мілісекундах"""
+    if len(samples) < 2:
+        value = round(samples[0], 3) if samples else 0.0
+        return {'p50_ms': value, 'p95_ms': value, 'p99_ms': value, 'max_ms': value}
+    q = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'p50_ms': round(q[49], 3),
+        'p95_ms': round(q[94], 3),
+        'p99_ms': round(q[98], 3),
+        'max_ms': round(max(samples), 3)
+    }
+
+
+def run(stations=16, days=1096, requests_per_endpoint=200, concurrency=8, sheets_latency=0.05):
+    """Запускає fake Sheets + додаток і вимірює затримки кожного ендпоінту"""
+    import requests
+
+    sheets_server = FakeSheetsServer(make_sheets(stations, days=days), latency=sheets_latency).start()
+    os.environ.update({
+        'GOOGLE_API_KEY': 'benchmark',
+        'SPREADSHEET_ID': 'benchmark',
+        'SHEETS_API_ENDPOINT': sheets_server.url,
+        'SNAPSHOT_PATH': ''
+    })
+
+    import logging
+
+    import app as app_module
+    import data_parser
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    data_parser.API_KEY, data_parser.SPREADSHEET_ID = 'benchmark', 'benchmark'
+    data_parser.SNAPSHOT_PATH = ''
+
+    http_server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{http_server.server_port}'
+
+    local = threading.local()
+
+    def fetch(path):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        response = session.get(base_url + path, headers={'Accept-Encoding': 'gzip'}, timeout=60)
+        response.content
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    try:
+        # Перший запит - холодний старт (завантаження даних з fake Sheets)
+        cold_ms, _ = fetch('/api/stations')
+        date_range = requests.get(base_url + '/api/date-range', timeout=60).json()
+        station_ids = [s['station_id'] for s in requests.get(base_url + '/api/stations', timeout=60).json()['stations']]
+
+        results = {'cold_start_ms': round(cold_ms, 3), 'endpoints': {}}
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for name, path in _endpoints(station_ids, date_range['min_date'], date_range['max_date']).items():
+                print(f"  навантаження: {name}")
+                samples = list(pool.map(fetch, [path] * requests_per_endpoint))
+                errors = sum(1 for _, status in samples if status != 200)
+                results['endpoints'][name] = dict(
+                    percentiles([ms for ms, _ in samples]),
+                    requests=requests_per_endpoint,
+                    errors=errors
+                )
+        results['sheets_requests'] = sheets_server.request_count
+        return results
+    finally:
+        http_server.shutdown()
+        sheets_server.stop()
@@ -0,0 +1,74 @@
+"""
+Мікро-бенчмарки гарячих ділянок: парсинг листа виробітку, фільтрація по датах,
+агрегація та CSV експорт на синтетичних таблицях різного розміру
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_parser
+from report_export import iter_report_rows, stream_csv
+from synthetic import make_production_grid, make_stations
+
+# Масштаби: (станцій, інверторів на станцію, днів)
+SCALES = [
+    (16, 3, 365),
+    (16, 3, 1096),
+    (160, 3, 1096)
+]
+
+
+def timed(func, repeat=5):
+    """Виконує func repeat разів; повертає мінімум та медіану в мілісекундах"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'min_ms': round(min(samples), 3), 'median_ms': round(statistics.median(samples), 3)}
+
+
+def bench_scale(stations, inverters, days, repeat=5):
+    """Усі мікро-бенчмарки для одного масштабу"""
+    grid = make_production_grid(stations, inverters, days)
+    station_list = make_stations(stations)
+    store = data_parser.parse_production_grid(grid)
+    station_ids = store.station_ids()
+    start_date, end_date = store.dates[len(store.dates) // 2], store.dates[-1]
+    records = store.to_records()
+
+    def export_csv():
+        for _ in stream_csv(iter_report_rows(
+            store, station_list, station_ids,
+            datetime.strptime(store.dates[0], '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
+        )):
+            pass
+
+    return {
+        'cells': stations * inverters * days,
+        'parse': timed(lambda: data_parser.parse_production_grid(grid), repeat),
+        'filter_store': timed(lambda: store.to_records(station_ids, start_date, end_date), repeat),
+        'filter_records': timed(
+            lambda: data_parser.filter_production_data(records, station_ids, start_date, end_date), repeat
+        ),
+        'total_all_stations': timed(
+            lambda: [store.total([sid], start_date, end_date) for sid in station_ids], repeat
+        ),
+        'bucket_month_fleet': timed(lambda: store.bucket_totals(station_ids, 'month'), repeat),
+        'resample_week': timed(lambda: store.resample(station_ids, 'week', start_date, end_date), repeat),
+        'export_csv': timed(export_csv, repeat)
+    }
+
+
+def run(scales=SCALES, repeat=5):
+    """Результати для всіх масштабів: {'16x3x365': {...}, ...}"""
+    results = {}
+    for stations, inverters, days in scales:
+        name = f'{stations}x{inverters}x{days}'
+        print(f"  мікро: {name}")
+        results[name] = bench_scale(stations, inverters, days, repeat)
+    return results
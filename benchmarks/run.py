@@ -0,0 +1,93 @@
+"""
+Запуск набору бенчмарків і збереження результатів у JSON
+
+    python benchmarks/run.py                      # мікро + навантаження + запуск
+    python benchmarks/run.py --only micro --quick
+    python benchmarks/run.py --compare benchmarks/results/old.json
+
+Результати зберігаються в benchmarks/results/<дата-час>.json; з --compare
+виводиться відношення нових показників до попередніх (>1 - повільніше)
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+def _flatten(data, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1} (лише числові значення)"""
+    flat = {}
+    for key, value in data.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(new, old):
+    """Порівнює показники часу (*_ms) двох прогонів; повертає [(назва, старе, нове, відношення)]"""
+    new_flat, old_flat = _flatten(new['results']), _flatten(old['results'])
+    rows = []
+    for name, value in sorted(new_flat.items()):
+        if name.endswith('_ms') and old_flat.get(name):
+            rows.append((name, old_flat[name], value, value / old_flat[name]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки моніторингу СЕС')
+    parser.add_argument('--only', choices=['micro', 'load', 'startup'], action='append',
+                        help='запустити лише вибрані групи (можна кілька разів)')
+    parser.add_argument('--quick', action='store_true', help='менші масштаби та кількість запитів')
+    parser.add_argument('--output', help='шлях до файлу результатів')
+    parser.add_argument('--compare', help='попередній файл результатів для порівняння')
+    args = parser.parse_args()
+
+    groups = args.only or ['micro', 'load', 'startup']
+    results = {}
+
+    if 'micro' in groups:
+        import micro
+        scales = micro.SCALES[:2] if args.quick else micro.SCALES
+        results['micro'] = micro.run(scales, repeat=3 if args.quick else 5)
+
+    if 'startup' in groups:
+        import startup
+        results['startup'] = startup.measure(3 if args.quick else 5)['results']
+
+    if 'load' in groups:
+        import load
+        results['load'] = load.run(requests_per_endpoint=50 if args.quick else 200)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{datetime.now().strftime("%Y%m%d-%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✓ Результати збережено: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        for name, old_value, new_value, ratio in compare(report, previous):
+            marker = '⚠' if ratio > 1.1 else ' '
+            print(f"{marker} {name}: {old_value:.3f} -> {new_value:.3f} ms (x{ratio:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Вимірювання часу запуску додатку
+Кожен запуск - окремий процес Python (як новий воркер gunicorn): час імпорту app,
+час першої відповіді /api/stations та пікова пам'ять процесу.
+
+Запуск:
+    python benchmarks/startup.py --runs 5 [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Код, що виконується в дочірньому процесі
+_PROBE = '''
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/stations')
+first_response = time.perf_counter()
+json.dump({
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (first_response - imported) * 1000,
+    'status': response.status_code,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+}, sys.stdout)
+'''
+
+
+def measure_once(env):
+    """Один холодний запуск; повертає словник з вимірами"""
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    # Останній рядок - JSON (перед ним можуть бути повідомлення додатку)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(runs, env=None):
+    """Медіана та максимум по кількох холодних запусках"""
+    samples = [measure_once(env or dict(os.environ)) for _ in range(runs)]
+    summary = {}
+    for key in ('import_ms', 'first_response_ms', 'max_rss_kb'):
+        values = [sample[key] for sample in samples]
+        summary[key] = {'median': round(statistics.median(values), 2), 'max': round(max(values), 2)}
+    return {'runs': runs, 'results': summary}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Час запуску додатку')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='файл для збереження результатів (JSON)')
+    args = parser.parse_args()
+
+    report = measure(args.runs)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
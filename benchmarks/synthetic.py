@@ -0,0 +1,68 @@
+"""
+Генератор синтетичних таблиць у форматі робочої Google таблиці
+N станцій, кілька рядків інверторів на станцію, M колонок з датами,
+десяткова кома та порожні клітинки (див. fake_sheets_server.build_sample_sheets)
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_sheets_server import PRODUCTION_SHEET, build_sample_sheets
+
+BRANDS = ['Huawei', 'SMA', 'Fronius', 'Sungrow', 'GoodWe']
+REGIONS = [
+    ('Київська обл., Бориспіль', 50.35, 30.95),
+    ('Вінницька обл., Вінниця', 49.23, 28.47),
+    ('Дніпропетровська обл., Дніпро', 48.46, 35.04),
+    ('Харківська обл., Харків', 49.99, 36.23),
+    ('Одеська обл., Одеса', 46.48, 30.72),
+    ('Запорізька обл., Запоріжжя', 47.84, 35.14),
+    ('Хмельницька обл., Хмельницький', 49.42, 26.99),
+    ('Полтавська обл., Полтава', 49.59, 34.55)
+]
+
+
+def make_stations(count, seed=1):
+    """Список з count синтетичних станцій (по дві станції в парі, як у робочій таблиці)"""
+    rng = random.Random(seed)
+    stations = []
+    for i in range(count):
+        location, lat, lon = REGIONS[(i // 2) % len(REGIONS)]
+        brand = BRANDS[(i // 2) % len(BRANDS)]
+        capacity = float(rng.randrange(150, 400, 10))
+        stations.append({
+            'station_id': f'SS{i + 1:03d}',
+            'station_name': f'СЕС Синтетична-{i + 1}',
+            'station_pair': f'P{i // 2 + 1}',
+            'location': location,
+            'latitude': round(lat + rng.uniform(-0.05, 0.05), 4),
+            'longitude': round(lon + rng.uniform(-0.05, 0.05), 4),
+            'commissioning_date': '2020-05-01',
+            'total_capacity_kw': capacity,
+            'panel_type': 'JA Solar',
+            'panel_power_w': 450,
+            'panel_count': int(capacity * 1000 / 450),
+            'inverter_brand': brand,
+            'inverter_model': f'{brand}-100K',
+            'inverter_count': 3,
+            'inverter_power_kw': 100.0,
+            'mounting_type': 'ground-mounted',
+            'monitoring_system': f'{brand} Cloud'
+        })
+    return stations
+
+
+def make_sheets(stations=16, inverters=3, days=1096, blank_rate=0.02, seed=42):
+    """Обидва листи таблиці: {назва листа: рядки}"""
+    return build_sample_sheets(
+        make_stations(stations, seed),
+        days=days, inverter_rows=inverters, blank_rate=blank_rate, seed=seed
+    )
+
+
+def make_production_grid(stations=16, inverters=3, days=1096, blank_rate=0.02, seed=42):
+    """Лише лист "Выработка энергии" (рядок 1 - дати, далі рядки інверторів)"""
+    return make_sheets(stations, inverters, days, blank_rate, seed)[PRODUCTION_SHEET]
+
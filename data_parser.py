@@ -2,11 +2,30 @@
 Модуль для отримання даних з Google Sheets
 ВИПРАВЛЕНО: читає дані з горизонтального формату (дати в стовпцях D, E, F...)
 """
+import hashlib
+import json
 import os
-from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import random
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from operator import add, itemgetter
 from dotenv import load_dotenv
+from analytics import ANALYTICS_BUCKETS, compute_analytics, filter_periods
+from metrics import (
+    ANALYTICS_DURATION, CACHE_REQUESTS, CELLS_PARSED, FALLBACK_ACTIVATIONS, PARSE_DURATION, ROWS_PARSED,
+    SNAPSHOT_SYNCED_AT, SOURCE_SYNCS, SYNC_DURATION
+)
+from intraday_store import IntradayStore
+from production_store import NAN, ProductionStore, BUCKETS, lttb, records_to_columns, thin_columns, to_date_str
+from sheets_client import SheetsError, column_letters, get_client
+from snapshot_file import load_snapshot, save_snapshot
+from station_registry import StationRegistry
 
 # Завантаження змінних середовища
 load_dotenv()
@@ -15,6 +34,15 @@ load_dotenv()
 API_KEY = os.getenv('GOOGLE_API_KEY')
 SPREADSHEET_ID = os.getenv('SPREADSHEET_ID')
 
+# Кілька таблиць (наприклад, по регіонах): SHEETS_SOURCES="kyiv=<id таблиці>,odesa=<id таблиці>"
+# Таблиці читаються паралельно та об'єднуються в один парк; ID станцій і пар
+# отримують префікс джерела ("kyiv:SS001"). Без SHEETS_SOURCES - одна таблиця SPREADSHEET_ID
+SHEETS_SOURCES = os.getenv('SHEETS_SOURCES', '')
+
+# Скільки секунд чекати на одне джерело; повільне або недоступне джерело
+# не блокує інші - для нього залишаються останні успішно завантажені дані
+SOURCE_TIMEOUT = int(os.getenv('SOURCE_TIMEOUT', '180'))
+
 # Резервні дані станцій (ТІЛЬКИ якщо Google Sheets недоступний)
 # Дані з таблиці: 16 станцій, загальна потужність 4230 кВт
 FALLBACK_STATIONS = [
@@ -37,65 +65,142 @@ FALLBACK_STATIONS = [
 ]
 
 # Резервні дані виробітку (з датами 2021-2024)
-def generate_fallback_production():
-    """Генерує резервні дані виробітку з реальними датами (4 роки)"""
-    start_date = datetime(2021, 10, 11)
-    end_date = datetime(2024, 10, 10)
-    
-    production_data = {}
+# Генеруються лише при першому зверненні (не під час імпорту модуля)
+FALLBACK_START_DATE = datetime(2021, 10, 11)
+FALLBACK_END_DATE = datetime(2024, 10, 10)
+
+_fallback_store = None
+_fallback_lock = threading.Lock()
+
+
+def _generate_fallback_store():
+    """Генерує резервні дані виробітку одразу у колонковому сховищі"""
+    days = (FALLBACK_END_DATE - FALLBACK_START_DATE).days + 1
+    # Вісь дат рахується один раз для всіх станцій
+    dates = [(FALLBACK_START_DATE + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
     
+    series = {}
     for station in FALLBACK_STATIONS:
-        station_id = station['station_id']
-        capacity = station['total_capacity_kw']
-        
-        daily_records = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            # Генерація реалістичних даних виробітку (сума всіх інверторів)
-            # Потужність / 3 інвертори * 4.5 год = виробіток на інвертор
-            # Приклад: 250кВт/3 * 4.5год = 375 кВт·год на інвертор → сума ~1125кВт·год
-            # Але у таблиці значення ~100-120 на інвертор → сума ~330кВт·год
-            base_production = capacity * 1.3  # 1.3 години піку (реалістичніше)
-            variation = (hash(f"{station_id}{current_date}") % 40) - 20
-            production = base_production + variation
-            
-            daily_records.append({
-                'date': current_date.strftime('%Y-%m-%d'),
-                'production_kwh': round(production, 2)
-            })
-            
-            current_date += timedelta(days=1)
+        # Генерація реалістичних даних виробітку (сума всіх інверторів)
+        # Потужність / 3 інвертори * 4.5 год = виробіток на інвертор
+        # Приклад: 250кВт/3 * 4.5год = 375 кВт·год на інвертор → сума ~1125кВт·год
+        # Але у таблиці значення ~100-120 на інвертор → сума ~330кВт·год
+        base_production = round(station['total_capacity_kw'] * 1.3, 2)  # 1.3 години піку (реалістичніше)
         
-        production_data[station_id] = daily_records
+        # Відхилення -20..+19 кВт·год; генератор з фіксованим зерном дає однакові
+        # дані в усіх процесах (на відміну від hash(), що залежить від PYTHONHASHSEED)
+        noise = random.Random(station['station_id']).randbytes(days)
+        series[station['station_id']] = array('d', [base_production + (b % 40) - 20 for b in noise])
     
-    return production_data
+    return ProductionStore(dates, series)
 
-FALLBACK_PRODUCTION = generate_fallback_production()
 
+def get_fallback_store():
+    """Резервні дані виробітку (генеруються один раз і кешуються)"""
+    global _fallback_store
+    if _fallback_store is None:
+        with _fallback_lock:
+            if _fallback_store is None:
+                _fallback_store = _generate_fallback_store()
+    return _fallback_store
 
-def get_all_stations():
-    """Отримує список всіх станцій з Google Sheets або резервних даних"""
-    if not API_KEY or not SPREADSHEET_ID:
-        print("⚠ Використовуються резервні дані станцій")
-        return FALLBACK_STATIONS
-    
+
+def generate_fallback_production():
+    """Резервні дані виробітку у форматі {station_id: [{'date', 'production_kwh'}, ...]}"""
+    return get_fallback_store().to_records()
+
+
+# Діапазони таблиці
+# "Станции и оборудование": A-R (до колонки R включно), усі заповнені рядки
+# "Выработка энергии": рядок 1 - дати в колонках D, E, F...; з рядка 2 - дані,
+#                      колонка B - station_id (SS001, SS002...)
+STATIONS_RANGE = "'Станции и оборудование'!A2:R"
+PRODUCTION_SHEET = 'Выработка энергии'
+
+# Індекс першої колонки з датами (D)
+FIRST_DATE_COL = 3
+
+# Скільки колонок читати одним запитом
+SHEETS_COLUMN_CHUNK = int(os.getenv('SHEETS_COLUMN_CHUNK', '365'))
+
+# Скільки запитів до Google Sheets виконувати паралельно
+SHEETS_MAX_WORKERS = int(os.getenv('SHEETS_MAX_WORKERS', '4'))
+
+# Скільки останніх синхронізованих колонок перечитувати при інкрементальному оновленні
+SYNC_OVERLAP_COLUMNS = 1
+
+# Як часто (секунд) замість інкрементального оновлення перечитувати весь лист виробітку,
+# щоб підхопити виправлення минулих днів
+FULL_SYNC_INTERVAL = int(os.getenv('FULL_SYNC_INTERVAL', '86400'))
+
+# Налаштування кешу знімків даних
+# CACHE_TTL - скільки секунд знімок вважається свіжим; після цього його
+# віддаємо як є, а оновлення запускаємо у фоновому потоці
+CACHE_TTL = int(os.getenv('CACHE_TTL', '300'))
+
+# Файл знімка на диску для швидкого холодного старту (порожнє значення - вимкнено)
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'snapshot.bin'))
+
+# Спільний знімок для всіх воркерів (gunicorn): дані з Google Sheets завантажує
+# лише один процес за раз (файлове блокування), решта читають файл SNAPSHOT_PATH
+# через mmap - одна копія даних у сторінковому кеші ОС на всі воркери
+SHARED_SNAPSHOT = os.getenv('SHARED_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+
+# Як часто (секунд) воркер перевіряє, чи не з'явився новіший файл спільного знімка
+SHARED_CHECK_INTERVAL = 1.0
+
+# Скільки останніх змін даних (між послідовними версіями) зберігати для /api/production/delta
+DELTA_LOG_SIZE = int(os.getenv('DELTA_LOG_SIZE', '32'))
+
+# Внутрішньодобові (15-хвилинні) дані: каталог з CSV вивантаженнями інверторів
+# (порожнє значення - вимкнено) та каталог місячних блоків сховища
+# Денні значення станцій з такими даними рахуються згорткою внутрішньодобових показників
+INTRADAY_IMPORT_DIR = os.getenv('INTRADAY_IMPORT_DIR', '')
+INTRADAY_DIR = os.getenv('INTRADAY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'intraday'))
+
+# Найдовший період внутрішньодобового запиту, днів
+INTRADAY_MAX_DAYS = int(os.getenv('INTRADAY_MAX_DAYS', '31'))
+
+# Поточний знімок: {'stations', 'registry', 'store', 'sync', 'source', 'sources', 'conflicts',
+#                   'version', 'synced_at', 'refreshed_at'}
+# sync - стан синхронізації по джерелах {назва: {'station_rows', 'last_col', 'full_synced_at'}}
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_refresh_thread = None
+
+# Заміна поточного знімка (фонове оновлення та підхоплення спільного файлу)
+_install_lock = threading.Lock()
+
+# Оновлення, що виконується зараз (Future); інші виклики чекають на його результат
+_inflight_refresh = None
+_inflight_lock = threading.Lock()
+
+# Спільний знімок: ідентифікатор відкритого файлу (st_dev, st_ino) та час останньої перевірки
+_shared_file_id = None
+_shared_checked_at = 0.0
+_shared_check_lock = threading.Lock()
+
+# Журнал змін: (попередня версія, нова версія, {station_id: {date: value або None}} або None)
+_delta_log = deque(maxlen=DELTA_LOG_SIZE)
+
+# Аналітика парку для поточної версії даних: (версія, результат compute_analytics)
+_analytics = None
+_analytics_lock = threading.Lock()
+
+# Сповіщення про нову версію даних (для потоку подій /api/stream)
+_version_changed = threading.Condition()
+
+# Сховище внутрішньодобових даних (створюється при першому зверненні)
+_intraday = None
+_intraday_lock = threading.Lock()
+
+
+def _parse_stations(values):
+    """Парсить рядки листа "Станции и оборудование"; повертає None, якщо дані недоступні"""
     try:
-        service = build('sheets', 'v4', developerKey=API_KEY)
-        sheet = service.spreadsheets()
-        
-        # Читання даних з листа "Станции и оборудование"
-        # Структура: A-R (до колонки R включно)
-        result = sheet.values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range="'Станции и оборудование'!A2:R100"
-        ).execute()
-        
-        values = result.get('values', [])
-        
         if not values:
-            print("⚠ Дані не знайдено, використовуються резервні")
-            return FALLBACK_STATIONS
+            print("⚠ Дані станцій не знайдено")
+            return None
         
         stations = []
         for row in values:
@@ -128,133 +233,1074 @@ def get_all_stations():
             print(f"✓ Завантажено {len(stations)} станцій з Google Sheets")
             return stations
         else:
-            print("⚠ Помилка парсингу, використовуються резервні дані")
-            return FALLBACK_STATIONS
+            print("⚠ Помилка парсингу станцій")
+            return None
             
-    except HttpError as e:
-        print(f"⚠ Помилка API: {e}")
-        return FALLBACK_STATIONS
     except Exception as e:
-        print(f"⚠ Помилка завантаження: {e}")
-        return FALLBACK_STATIONS
+        print(f"⚠ Помилка парсингу станцій: {e}")
+        return None
 
 
-def get_production_data(station_ids=None, start_date=None, end_date=None):
+def _parse_date(value):
+    """Дата з заголовка ('2021-10-12' або '12.10.2021') у форматі 'YYYY-MM-DD'; None - не дата"""
+    for date_format in ('%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(value.strip(), date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_header_dates(header_values, first_col):
     """
-    Отримує дані виробітку для вибраних станцій за період
-    ЛОГІКА: у колонці B листа "Виробіток енергії" шукаємо ВСІ рядки з SS001,
-             знаходимо колонку з датою (2021-10-12) і сумуємо всі значення
+    Дати з рядка 1 листа "Выработка энергии"
+    header_values починаються з колонки first_col; повертає [(дата, індекс колонки), ...]
+    """
+    date_columns = []  # [('2021-10-11', 3), ('2021-10-12', 4), ...] - (дата, індекс)
+    for i, col_value in enumerate(header_values):
+        if col_value:
+            date_str = _parse_date(col_value)
+            # Пропускаємо нерозпізнані дати
+            if date_str:
+                date_columns.append((date_str, first_col + i))
+    return date_columns
+
+
+def _parse_station_rows(id_rows):
+    """Колонка B листа виробітку: station_id для кожного рядка даних (None - не станція)"""
+    station_rows = []
+    for row in id_rows:
+        station_id = row[0].strip() if row else ''
+        # Пропускаємо рядки без station_id (SS001, SS002...)
+        station_rows.append(station_id if station_id.startswith('SS') else None)
+    return station_rows
+
+
+class _CellValues(dict):
+    """
+    Кеш перетворення тексту клітинки на число: {текст: значення}
+    Однакові значення (порожні клітинки, округлені показники) трапляються в листі
+    тисячі разів, тому кожен унікальний текст розбирається лише один раз
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Наявність значення: 1 - число, 0 - порожня або нечислова клітинка
+        self.present = {}
+
+    def __missing__(self, text):
+        try:
+            # Читаємо значення з таблиці (кВт·год), заміна коми на крапку
+            value = float(str(text).replace(',', '.')) if text != '' else None
+        except ValueError:
+            value = None
+        self[text] = 0.0 if value is None else value
+        self.present[text] = 0 if value is None else 1
+        return self[text]
+
+
+def _sum_production(station_rows, date_columns, rows, first_col, cells=None):
+    """
+    Сумує значення всіх рядків (інверторів) з однаковим station_id
+    rows - фрагмент листа з рядка 2, де rows[i][0] відповідає колонці first_col
+    Кожен рядок перетворюється на список чисел цілком (через кеш _CellValues),
+    а рядки станції додаються поелементно - без циклу Python по клітинках.
+    Повертає {station_id: (sums, counts)} - списки, вирівняні з date_columns
+    (counts - кількість рядків станції зі значенням за дату)
     """
-    if not API_KEY or not SPREADSHEET_ID:
-        print("⚠ Використовуються резервні дані виробітку")
-        return filter_production_data(FALLBACK_PRODUCTION, station_ids, start_date, end_date)
+    cells = _CellValues() if cells is None else cells
+    width = len(date_columns)
+    offsets = [col_index - first_col for _, col_index in date_columns]
+    contiguous = offsets == list(range(offsets[0], offsets[0] + width)) if width else True
+    row_width = offsets[-1] + 1 if width else 0
+    pick = itemgetter(*offsets) if width > 1 and not contiguous else None
+    padding = [''] * row_width
     
-    try:
-        service = build('sheets', 'v4', developerKey=API_KEY)
-        sheet = service.spreadsheets()
+    totals = {}
+    for station_id, row in zip(station_rows, rows):
+        if not station_id:
+            continue
+        if len(row) < row_width:
+            row = row + padding[len(row):]
+        if contiguous:
+            selected = row[offsets[0]:row_width] if width else []
+        else:
+            selected = pick(row) if pick else [row[offsets[0]]]
         
-        # КРОК 1: Читання заголовків (рядок 1) - дати в колонках D, E, F...
-        # Лист: "Выработка энергии"
-        header_result = sheet.values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range="'Выработка энергии'!D1:ZZ1"  # Дати починаються з колонки D
-        ).execute()
+        values = list(map(cells.__getitem__, selected))
+        present = list(map(cells.present.__getitem__, selected))
         
-        header_values = header_result.get('values', [[]])[0]
+        total = totals.get(station_id)
+        if total is None:
+            totals[station_id] = (values, present)
+        else:
+            totals[station_id] = (list(map(add, total[0], values)), list(map(add, total[1], present)))
+    
+    # Порядок станцій - як у листі; станції без рядків у фрагменті - без даних
+    return {
+        station_id: totals.get(station_id) or ([0.0] * width, [0] * width)
+        for station_id in dict.fromkeys(filter(None, station_rows))
+    }
+
+
+def _merge_windows(windows):
+    """Об'єднує результати вікон колонок [(date_columns, totals), ...] у порядку колонок"""
+    date_columns = []
+    merged = {}
+    for window_dates, totals in windows:
+        date_columns.extend(window_dates)
+        for station_id, (sums, counts) in totals.items():
+            if station_id in merged:
+                merged[station_id][0].extend(sums)
+                merged[station_id][1].extend(counts)
+            else:
+                merged[station_id] = (list(sums), list(counts))
+    return date_columns, merged
+
+
+def _production_days(date_columns, totals):
+    """Сумовані значення у вигляді {station_id: {date: sum_production}} (лише дні з даними)"""
+    station_data = {}
+    for station_id, (sums, counts) in totals.items():
+        days = station_data[station_id] = {}
+        for (date_str, _), value, count in zip(date_columns, sums, counts):
+            if count:
+                # Дата може повторюватись у заголовку - значення колонок додаються
+                days[date_str] = days.get(date_str, 0.0) + value
+    return station_data
+
+
+def _production_store(date_columns, totals):
+    """
+    ProductionStore з результатів _sum_production
+    Колонки без жодного значення не потрапляють на вісь дат; якщо дати
+    в заголовку не зростають строго (повтори, ручне сортування), сховище
+    будується через словники
+    """
+    dates = [date_str for date_str, _ in date_columns]
+    if any(a >= b for a, b in zip(dates, dates[1:])):
+        return ProductionStore.from_daily_sums(_production_days(date_columns, totals))
+    
+    filled = [0] * len(dates)
+    for _, counts in totals.values():
+        filled = list(map(add, filled, counts))
+    keep = [i for i, count in enumerate(filled) if count]
+    if len(keep) != len(dates):
+        pick = itemgetter(*keep) if len(keep) > 1 else (lambda values: [values[keep[0]]] if keep else [])
+        dates = [dates[i] for i in keep]
+        totals = {station_id: (pick(sums), pick(counts)) for station_id, (sums, counts) in totals.items()}
+    
+    # Кумулятивні суми рахуються одразу з сум (порожні дні = 0) - без проходу по NaN
+    series, prefix = {}, {}
+    for station_id, (sums, counts) in totals.items():
+        series[station_id] = array('d', [value if count else NAN for value, count in zip(sums, counts)])
+        prefix_sums = array('d', [0.0])
+        prefix_sums.extend(accumulate(sums))
+        prefix_counts = array('q', [0])
+        prefix_counts.extend(accumulate(map(bool, counts)))
+        prefix[station_id] = (prefix_sums, prefix_counts)
+    return ProductionStore(dates, series, prefix)
+
+
+def parse_production_grid(grid):
+    """
+    Парсить повний лист "Выработка энергии" (рядок 1 - дати з колонки D,
+    колонка B - station_id, дані з рядка 2) у ProductionStore
+    """
+    station_rows = _parse_station_rows([row[1:2] for row in grid[1:]])
+    date_columns = _parse_header_dates(grid[0][FIRST_DATE_COL:] if grid else [], FIRST_DATE_COL)
+    return _production_store(date_columns, _sum_production(station_rows, date_columns, grid[1:], 0))
+
+
+def get_sources():
+    """
+    Налаштовані джерела даних: [(назва, spreadsheet_id), ...]
+    Без SHEETS_SOURCES - одне джерело 'default' з SPREADSHEET_ID
+    """
+    if not SHEETS_SOURCES.strip():
+        return [('default', SPREADSHEET_ID)] if SPREADSHEET_ID else []
+    
+    sources = []
+    for position, item in enumerate(SHEETS_SOURCES.split(','), 1):
+        name, separator, spreadsheet_id = item.strip().partition('=')
+        if not separator:
+            # Лише ID таблиці - назва за порядковим номером
+            name, spreadsheet_id = f'source{position}', name
+        name, spreadsheet_id = name.strip(), spreadsheet_id.strip()
+        if not spreadsheet_id:
+            continue
+        if any(name == existing for existing, _ in sources):
+            print(f"⚠ Джерело '{name}' вказано кілька разів, використовується перше")
+            continue
+        sources.append((name, spreadsheet_id))
+    return sources
+
+
+_sheets_pool = None
+_sheets_pool_lock = threading.Lock()
+_sources_pool = None
+
+
+def _get_sheets_pool():
+    """
+    Спільний пул потоків для запитів до Google Sheets
+    Потоки живуть довше за одне оновлення, тому їх HTTP з'єднання перевикористовуються;
+    кожне джерело отримує SHEETS_MAX_WORKERS потоків, щоб повільне не займало чужі
+    """
+    global _sheets_pool
+    with _sheets_pool_lock:
+        if _sheets_pool is None:
+            _sheets_pool = ThreadPoolExecutor(
+                max_workers=SHEETS_MAX_WORKERS * max(len(get_sources()), 1), thread_name_prefix='sheets'
+            )
+        return _sheets_pool
+
+
+def _get_sources_pool():
+    """
+    Пул потоків для паралельного завантаження джерел
+    Окремий від пулу запитів: завантаження джерела саме чекає на запити в _sheets_pool.
+    Потоків удвічі більше за джерела - завантаження, що не вклалося в SOURCE_TIMEOUT
+    і ще виконується, не затримує наступне оновлення інших джерел
+    """
+    global _sources_pool
+    with _sheets_pool_lock:
+        if _sources_pool is None:
+            _sources_pool = ThreadPoolExecutor(max_workers=2 * max(len(get_sources()), 1), thread_name_prefix='source')
+        return _sources_pool
+
+
+def _reset_after_fork():
+    """
+    Стан процесу після fork (воркер gunicorn з --preload): потоки пулів, фонового оновлення
+    та незавершене оновлення батьківського процесу в дочірньому не існують, а блокування
+    могли бути захоплені ними в момент fork. Знімок лишається - він лише для читання
+    """
+    global _sheets_pool, _sources_pool, _sheets_pool_lock, _refresh_thread, _inflight_refresh
+    global _fallback_lock, _snapshot_lock, _install_lock, _inflight_lock, _shared_check_lock
+    global _analytics_lock, _version_changed, _intraday, _intraday_lock
+    _sheets_pool = _sources_pool = None
+    _intraday = None
+    _refresh_thread = _inflight_refresh = None
+    _sheets_pool_lock = threading.Lock()
+    _fallback_lock = threading.Lock()
+    _snapshot_lock = threading.Lock()
+    _install_lock = threading.Lock()
+    _inflight_lock = threading.Lock()
+    _shared_check_lock = threading.Lock()
+    _analytics_lock = threading.Lock()
+    _version_changed = threading.Condition()
+    _intraday_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _fetch_sheets(spreadsheet_id, previous_store=None, sync=None):
+    """
+    Читає станції та виробіток з однієї таблиці Google Sheets
+    Незалежні діапазони читаються паралельно у два етапи:
+      1) лист станцій + колонка station_id та реальний розмір листа виробітку;
+      2) вікна по SHEETS_COLUMN_CHUNK колонок (кожне разом зі своїм рядком дат).
+    Якщо є попередній стан синхронізації (sync), читаються лише колонки, новіші
+    за останню синхронізовану дату (разом з нею самою - день міг бути заповнений
+    не повністю).
+    Повертає (stations, store, sync); None замість даних, які не вдалося отримати
+    Помилки Google Sheets (SheetsError) передаються викликачу
+    """
+    incremental = previous_store is not None and sync is not None
+    if incremental and time.time() - sync.get('full_synced_at', 0) > FULL_SYNC_INTERVAL:
+        print("✓ Планове повне перечитування листа виробітку")
+        incremental = False
+        previous_store = sync = None
+    client = get_client(API_KEY)
+    pool = _get_sheets_pool()
+    
+    # КРОК 1: станції, колонка B листа виробітку та розмір листа - паралельно
+    values_future = pool.submit(
+        client.batch_get, spreadsheet_id, [STATIONS_RANGE, f"'{PRODUCTION_SHEET}'!B2:B"]
+    )
+    grid_future = pool.submit(client.get_grid_size, spreadsheet_id, PRODUCTION_SHEET)
+    station_values, id_rows = values_future.result()
+    _, column_count = grid_future.result()
+    
+    with PARSE_DURATION.time(sheet='stations'):
+        stations = _parse_stations(station_values)
+        station_rows = _parse_station_rows(id_rows)
+    ROWS_PARSED.inc(len(station_values), sheet='stations')
+    
+    if incremental and station_rows != sync['station_rows']:
+        print("⚠ Змінились рядки листа виробітку, виконується повне перезавантаження")
+        incremental = False
+        previous_store = sync = None
+    
+    if not any(station_rows):
+        print("⚠ Дані виробітку не знайдено")
+        return stations, None, None
+    
+    # КРОК 2: вікна колонок з рядками 1..last_row - паралельно
+    if incremental:
+        first_col = max(sync['last_col'] - SYNC_OVERLAP_COLUMNS + 1, FIRST_DATE_COL)
+    else:
+        first_col = FIRST_DATE_COL
+    last_row = len(station_rows) + 1
+    windows = [
+        (col, min(col + SHEETS_COLUMN_CHUNK, column_count) - 1)
+        for col in range(first_col, column_count, SHEETS_COLUMN_CHUNK)
+    ]
+    chunks = pool.map(
+        lambda window: client.get_values(
+            spreadsheet_id,
+            f"'{PRODUCTION_SHEET}'!{column_letters(window[0])}1:{column_letters(window[1])}{last_row}"
+        ),
+        windows
+    )
+    
+    # Парсинг вікон (спільний кеш значень клітинок) та об'єднання у порядку колонок
+    cells = _CellValues()
+    parsed = []
+    for (window_first, _), rows in zip(windows, chunks):
+        with PARSE_DURATION.time(sheet='production'):
+            window_dates = _parse_header_dates(rows[0] if rows else [], window_first)
+            parsed.append((
+                window_dates,
+                _sum_production(station_rows, window_dates, rows[1:], window_first, cells)
+            ))
+        ROWS_PARSED.inc(max(len(rows) - 1, 0), sheet='production')
+        CELLS_PARSED.inc(sum(len(row) for row in rows[1:]))
+    date_columns, totals = _merge_windows(parsed)
+    
+    print(f"✓ Знайдено {len(date_columns)} дат в заголовку листа '{PRODUCTION_SHEET}'")
+    
+    if incremental and not date_columns:
+        return stations, previous_store, sync
+    
+    # Позначка синхронізації - остання колонка з даними, а не з датою: у заголовку
+    # можуть бути дати наперед, і тоді наступні оновлення їх не пропустять
+    last_col = sync['last_col'] if incremental else FIRST_DATE_COL - 1
+    for i in range(len(date_columns) - 1, -1, -1):
+        if any(counts[i] for _, counts in totals.values()):
+            last_col = date_columns[i][1]
+            break
+    new_sync = {
+        'station_rows': station_rows,
+        'last_col': last_col,
+        'full_synced_at': sync['full_synced_at'] if incremental else time.time()
+    }
+    
+    if incremental:
+        store = previous_store.with_days([date for date, _ in date_columns], _production_days(date_columns, totals))
+        print(f"✓ Синхронізовано {len(store.dates) - len(previous_store.dates)} нових дат з Google Sheets")
+    else:
+        store = _production_store(date_columns, totals)
+        print(f"✓ Завантажено дані виробітку для {len(totals)} станцій з Google Sheets")
+    
+    return stations, store, new_sync
+
+
+def _unique_stations(stations):
+    """Станції без повторів ID (залишається перший рядок); повертає (stations, повторені ID)"""
+    seen, unique, duplicates = set(), [], []
+    for station in stations:
+        if station['station_id'] in seen:
+            duplicates.append(station['station_id'])
+        else:
+            seen.add(station['station_id'])
+            unique.append(station)
+    return unique, duplicates
+
+
+def _fetch_source(name, spreadsheet_id, previous_store=None, sync=None):
+    """
+    Завантажує одне джерело; помилки не виходять назовні
+    Повертає {'stations', 'store', 'sync', 'duplicates', 'error', 'duration_ms'}
+    """
+    started = time.perf_counter()
+    result = {'stations': None, 'store': None, 'sync': None, 'duplicates': [], 'error': None}
+    try:
+        stations, store, new_sync = _fetch_sheets(spreadsheet_id, previous_store, sync)
+        if stations is None:
+            result['error'] = 'Дані станцій не знайдено'
+        elif store is None:
+            result['error'] = 'Дані виробітку не знайдено'
+        else:
+            stations, result['duplicates'] = _unique_stations(stations)
+            if result['duplicates']:
+                print(f"⚠ [{name}] Повторені ID станцій (використано перший рядок): {', '.join(result['duplicates'])}")
+            result.update(stations=stations, store=store, sync=new_sync)
+    except SheetsError as e:
+        result['error'] = str(e)
+    except Exception as e:
+        result['error'] = f'Помилка завантаження: {e}'
+    
+    if result['error']:
+        print(f"⚠ [{name}] {result['error']}")
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000)
+    return result
+
+
+def _fetch_sources(sources, previous_shards):
+    """
+    Завантажує всі джерела паралельно; на кожне чекаємо не довше SOURCE_TIMEOUT
+    Завантаження, що не встигло, продовжується у фоні, але його результат не використовується
+    Повертає результати _fetch_source у порядку sources
+    """
+    pool = _get_sources_pool()
+    futures = []
+    for name, spreadsheet_id in sources:
+        shard = previous_shards.get(name)
+        futures.append(pool.submit(
+            _fetch_source, name, spreadsheet_id,
+            shard['store'] if shard else None, shard['sync'] if shard else None
+        ))
+    
+    done, _ = wait(futures, timeout=SOURCE_TIMEOUT)
+    results = []
+    for (name, _), future in zip(sources, futures):
+        if future in done:
+            results.append(future.result())
+        else:
+            print(f"⚠ [{name}] Джерело не відповіло за {SOURCE_TIMEOUT} с")
+            results.append({
+                'stations': None, 'store': None, 'sync': None, 'duplicates': [],
+                'error': f'Перевищено час очікування ({SOURCE_TIMEOUT} с)', 'duration_ms': SOURCE_TIMEOUT * 1000
+            })
+    return results
+
+
+def _namespace(name, value):
+    """ID з префіксом джерела: 'kyiv:SS001' (порожнє значення залишається порожнім)"""
+    return f'{name}:{value}' if value else value
+
+
+def _previous_shard(previous, name, namespaced):
+    """
+    Дані джерела name з попереднього знімка (без префіксів) або None
+    Потрібні для інкрементальної синхронізації та як останні успішні дані, якщо джерело недоступне
+    """
+    sync = (previous.get('sync') or {}).get(name)
+    if not namespaced:
+        if any('source' in station for station in previous['stations'][:1]):
+            # Попередній знімок зібрано з кількох джерел
+            return None
+        return {'stations': previous['stations'], 'store': previous['store'], 'sync': sync}
+    
+    prefix = f'{name}:'
+    stations = [
+        {
+            **{key: value for key, value in station.items() if key != 'source'},
+            'station_id': station['station_id'][len(prefix):],
+            'station_pair': station['station_pair'][len(prefix):] if station['station_pair'].startswith(prefix) else station['station_pair']
+        }
+        for station in previous['stations'] if station.get('source') == name
+    ]
+    if not stations:
+        return None
+    
+    store = previous['store']
+    station_ids = [station_id for station_id in store.series if station_id.startswith(prefix)]
+    return {
+        'stations': stations,
+        'store': ProductionStore(
+            store.dates,
+            {station_id[len(prefix):]: store.series[station_id] for station_id in station_ids},
+            {station_id[len(prefix):]: store.prefix(station_id) for station_id in station_ids}
+        ),
+        'sync': sync
+    }
+
+
+def _merge_sources(shards, namespaced):
+    """
+    Об'єднує дані джерел в один парк: shards - [(назва, stations, store), ...]
+    Повертає (stations, store, conflicts); conflicts - ID станцій, що зустрічаються
+    в кількох джерелах (або кілька разів в одному): [{'station_id', 'sources'}, ...]
+    """
+    owners = {}
+    for name, stations, _ in shards:
+        for station in stations:
+            owners.setdefault(station['station_id'], []).append(name)
+    conflicts = [
+        {'station_id': station_id, 'sources': names}
+        for station_id, names in owners.items() if len(names) > 1
+    ]
+    
+    if not namespaced:
+        _, stations, store = shards[0]
+        return stations, store, conflicts
+    
+    stations = [
+        dict(
+            station,
+            station_id=_namespace(name, station['station_id']),
+            station_pair=_namespace(name, station['station_pair']),
+            source=name
+        )
+        for name, shard_stations, _ in shards for station in shard_stations
+    ]
+    store = ProductionStore.merge([(f'{name}:', store) for name, _, store in shards])
+    return stations, store, conflicts
+
+
+def _data_version(stations, store):
+    """Версія набору даних - хеш вмісту (однакова в усіх процесах для однакових даних)"""
+    hasher = hashlib.blake2b(digest_size=8)
+    hasher.update(json.dumps(stations, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    hasher.update('\n'.join(store.dates).encode('utf-8'))
+    for station_id, values in store.series.items():
+        hasher.update(station_id.encode('utf-8'))
+        hasher.update(memoryview(values).cast('B'))
+    return hasher.hexdigest()
+
+
+def _make_snapshot(stations, store, sync, source, synced_at, refreshed_at, version=None, sources=(), conflicts=()):
+    """Словник знімка даних"""
+    return {
+        'stations': stations,
+        'store': store,
+        'sync': sync,
+        'source': source,
+        'sources': list(sources),
+        'conflicts': list(conflicts),
+        'version': version or _data_version(stations, store),
+        'synced_at': synced_at,
+        'refreshed_at': refreshed_at
+    }
+
+
+def _load_snapshot(previous=None):
+    """
+    Будує новий знімок даних.
+    Усі джерела (таблиці) завантажуються паралельно й об'єднуються в один парк.
+    Якщо попередній знімок завантажено з Google Sheets - дочитуються лише нові дати.
+    Якщо джерело не відповідає - для нього залишаємо останні успішно завантажені дані
+    з попереднього знімка; лише якщо даних немає ні від одного джерела - резервні.
+    """
+    now = time.time()
+    sources = get_sources()
+    
+    if not API_KEY or not sources:
+        print("⚠ Використовуються резервні дані станцій та виробітку")
+        FALLBACK_ACTIVATIONS.inc(reason='not_configured')
+        return _make_snapshot(FALLBACK_STATIONS, get_fallback_store(), None, 'fallback', now, now)
+    
+    namespaced = len(sources) > 1
+    has_previous = previous is not None and previous['source'] == 'sheets'
+    previous_shards, previous_status = {}, {}
+    if has_previous:
+        previous_status = {status['name']: status for status in previous.get('sources') or ()}
+        for name, _ in sources:
+            shard = _previous_shard(previous, name, namespaced)
+            if shard is not None:
+                previous_shards[name] = shard
+    
+    with SYNC_DURATION.time(mode='incremental' if has_previous else 'full'):
+        results = _fetch_sources(sources, previous_shards)
+    
+    shards, sync, statuses = [], {}, []
+    for (name, spreadsheet_id), result in zip(sources, results):
+        status = {
+            'name': name,
+            'spreadsheet_id': spreadsheet_id,
+            'status': 'ok',
+            'stations': 0,
+            'synced_at': now,
+            'duration_ms': result['duration_ms'],
+            'error': result['error'],
+            'duplicate_station_ids': result['duplicates']
+        }
+        shard = previous_shards.get(name)
+        if result['error'] is None:
+            shard = result
+            SOURCE_SYNCS.inc(source=name, result='ok')
+        elif shard is not None:
+            print(f"⚠ [{name}] Залишаємо останні успішно завантажені дані джерела")
+            status.update(status='stale', synced_at=previous_status.get(name, {}).get('synced_at'))
+            SOURCE_SYNCS.inc(source=name, result='stale')
+        else:
+            status.update(status='failed', synced_at=None)
+            SOURCE_SYNCS.inc(source=name, result='failed')
         
-        # Парсинг дат із заголовків
-        date_columns = []  # [('2021-10-11', 3), ('2021-10-12', 4), ...] - (дата, індекс)
-        for i, col_value in enumerate(header_values):
-            if col_value:
-                try:
-                    # Спроба парсити дату
-                    date_obj = datetime.strptime(col_value.strip(), '%Y-%m-%d')
-                    date_columns.append((date_obj.strftime('%Y-%m-%d'), i + 3))  # i+3 тому що D=3
-                except ValueError:
-                    try:
-                        # Альтернативний формат
-                        date_obj = datetime.strptime(col_value.strip(), '%d.%m.%Y')
-                        date_columns.append((date_obj.strftime('%Y-%m-%d'), i + 3))
-                    except ValueError:
-                        # Пропускаємо нерозпізнані дати
-                        continue
+        if shard is not None:
+            status['stations'] = len(shard['stations'])
+            shards.append((name, shard['stations'], shard['store']))
+            if shard['sync'] is not None:
+                sync[name] = shard['sync']
+        statuses.append(status)
+    
+    if any(status['status'] == 'ok' for status in statuses):
+        stations, store, conflicts = _merge_sources(shards, namespaced)
+        if conflicts:
+            shown = ', '.join(conflict['station_id'] for conflict in conflicts[:10])
+            print(f"⚠ Станції з однаковими ID у кількох джерелах ({len(conflicts)}): {shown}{'…' if len(conflicts) > 10 else ''}")
+        return _make_snapshot(stations, store, sync, 'sheets', now, now, sources=statuses, conflicts=conflicts)
+    
+    if has_previous:
+        print("⚠ Google Sheets недоступний, залишаємо останній успішний знімок")
+        return dict(previous, sources=statuses, refreshed_at=now)
+    
+    print("⚠ Google Sheets недоступний, використовуються резервні дані")
+    FALLBACK_ACTIVATIONS.inc(reason='sheets_unavailable')
+    return _make_snapshot(FALLBACK_STATIONS, get_fallback_store(), None, 'fallback', now, now, sources=statuses)
+
+
+def _install_snapshot(snapshot):
+    """
+    Робить знімок поточним: журнал змін, метрики та сповіщення про нову версію
+    Версія - хеш вмісту, тому новизна визначається за (synced_at, refreshed_at): знімок,
+    не новіший за поточний (напр. інший потік уже встановив свіжіший), пропускається.
+    Повертає знімок, який після виклику є поточним
+    """
+    global _snapshot
+    
+    # Індекси станцій будуються один раз на набір станцій
+    registry = snapshot.get('registry')
+    if registry is None or registry.stations is not snapshot['stations']:
+        snapshot['registry'] = StationRegistry(snapshot['stations'])
+    
+    with _install_lock:
+        previous = _snapshot
+        if previous is not None and (snapshot['synced_at'], snapshot['refreshed_at']) <= (previous['synced_at'], previous['refreshed_at']):
+            return previous
+        
+        # Зміни записуються в журнал до заміни знімка, щоб журнал завжди
+        # містив версію, яку вже бачать читачі
+        if previous is not None and previous['version'] != snapshot['version']:
+            changes = None
+            if previous['stations'] == snapshot['stations']:
+                changes = snapshot['store'].changes_since(previous['store'])
+            _delta_log.append((previous['version'], snapshot['version'], changes))
         
-        print(f"✓ Знайдено {len(date_columns)} дат в заголовку листа 'Выработка энергии'")
+        _snapshot = snapshot
+        SNAPSHOT_SYNCED_AT.set(snapshot['synced_at'], source=snapshot['source'])
         
-        # КРОК 2: Читання даних виробітку (починаючи з рядка 2)
-        # Колонка B - station_id (SS001, SS002...)
-        data_result = sheet.values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range="'Выработка энергии'!A2:ZZ1000"  # Читаємо всі рядки
-        ).execute()
+        if previous is None or previous['version'] != snapshot['version']:
+            with _version_changed:
+                _version_changed.notify_all()
+    return snapshot
+
+
+def get_intraday_store():
+    """Сховище внутрішньодобових даних або None, якщо INTRADAY_IMPORT_DIR не налаштовано"""
+    global _intraday
+    if not INTRADAY_IMPORT_DIR:
+        return None
+    with _intraday_lock:
+        if _intraday is None:
+            _intraday = IntradayStore(INTRADAY_DIR)
+        else:
+            # Нові дані міг імпортувати інший воркер
+            _intraday.reload_if_changed()
+        return _intraday
+
+
+def _apply_intraday(snapshot):
+    """
+    Імпортує нові CSV з INTRADAY_IMPORT_DIR і замінює денні значення станцій,
+    для яких є внутрішньодобові дані, їх згорткою
+    """
+    try:
+        intraday = get_intraday_store()
+        if intraday is None:
+            return snapshot
         
-        data_values = data_result.get('values', [])
+        intraday.import_directory(INTRADAY_IMPORT_DIR)
+        known = {station['station_id'] for station in snapshot['stations']}
+        daily = {station_id: intraday.daily_totals(station_id) for station_id in intraday.station_ids() if station_id in known}
+        daily = {station_id: days for station_id, days in daily.items() if days}
+    except Exception as e:
+        # Збій внутрішньодобових даних не повинен зупиняти оновлення основного знімка
+        print(f"⚠ Помилка внутрішньодобових даних, залишаємо денні дані без змін: {e}")
+        return snapshot
+    if not daily:
+        return snapshot
+    
+    store = snapshot['store'].overlay(daily)
+    return dict(snapshot, store=store, version=_data_version(snapshot['stations'], store))
+
+
+def _refresh_and_save():
+    """Завантажує дані з Google Sheets, зберігає знімок на диск і робить його поточним"""
+    snapshot = _apply_intraday(_load_snapshot(_snapshot))
+    
+    # Після успішної синхронізації зберігаємо знімок на диск
+    if SNAPSHOT_PATH and snapshot['source'] == 'sheets' and snapshot['synced_at'] == snapshot['refreshed_at']:
+        try:
+            save_snapshot(SNAPSHOT_PATH, snapshot)
+            if SHARED_SNAPSHOT:
+                # Процес, що оновив дані, теж читає їх з файлу - одна копія на всі воркери
+                snapshot = _open_shared_snapshot() or snapshot
+        except OSError as e:
+            print(f"⚠ Не вдалося зберегти знімок на диск: {e}")
+    
+    return _install_snapshot(snapshot)
+
+
+@contextmanager
+def _refresh_file_lock():
+    """
+    Міжпроцесне блокування оновлення (fcntl.flock на SNAPSHOT_PATH + '.lock')
+    Блокування знімається ОС і при аварійному завершенні процесу
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # Немає flock (Windows) - координація лише в межах процесу
+        yield
+        return
+    
+    lock_path = SNAPSHOT_PATH + '.lock'
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _refresh_shared():
+    """
+    Оновлення спільного знімка: поки один воркер завантажує дані, інші чекають
+    на блокуванні, а потім просто відкривають записаний ним файл
+    """
+    with _refresh_file_lock():
+        _check_shared_snapshot(force=True)
+        try:
+            modified_at = os.stat(SNAPSHOT_PATH).st_mtime
+        except OSError:
+            modified_at = None
         
-        if not data_values:
-            print("⚠ Дані виробітку не знайдено, використовуються резервні")
-            return filter_production_data(FALLBACK_PRODUCTION, station_ids, start_date, end_date)
+        # Інший воркер щойно оновив (або намагався оновити) знімок
+        if _snapshot is not None and modified_at is not None and time.time() - modified_at <= CACHE_TTL:
+            return _snapshot
         
-        # Парсинг даних виробітку з групуванням по station_id
-        # Структура: {station_id: {date: sum_production}}
-        station_data = {}
+        snapshot = _refresh_and_save()
         
-        for row in data_values:
-            if len(row) < 4:
-                continue
-            
+        # Невдала спроба теж відмічається, щоб інші воркери не повторювали її до кінця CACHE_TTL
+        if snapshot['synced_at'] != snapshot['refreshed_at'] and modified_at is not None:
             try:
-                # Колонка B (індекс 1) - station_id (SS001, SS002...)
-                station_id = row[1].strip() if len(row) > 1 else None
-                
-                # Пропускаємо рядки без station_id
-                if not station_id or not station_id.startswith('SS'):
-                    continue
-                
-                # Ініціалізуємо словник для станції
-                if station_id not in station_data:
-                    station_data[station_id] = {}
-                
-                # Читаємо дані виробітку з колонок D, E, F... (індекси 3, 4, 5...)
-                for date_str, col_index in date_columns:
-                    if col_index < len(row) and row[col_index]:
-                        try:
-                            # Читаємо значення з таблиці (кВт·год)
-                            production_value = str(row[col_index]).replace(',', '.')  # Заміна коми на крапку
-                            production_kwh = float(production_value)
-                            
-                            # Додаємо до суми (сумуємо всі рядки з однаковим station_id)
-                            if date_str in station_data[station_id]:
-                                station_data[station_id][date_str] += production_kwh
-                            else:
-                                station_data[station_id][date_str] = production_kwh
-                                
-                        except (ValueError, IndexError):
-                            continue
-                
-            except (ValueError, IndexError) as e:
-                continue
-        
-        # Конвертуємо у фінальний формат
-        production_dict = {}
-        for station_id, dates in station_data.items():
-            production_dict[station_id] = [
-                {'date': date, 'production_kwh': production}
-                for date, production in sorted(dates.items())
-            ]
+                os.utime(SNAPSHOT_PATH)
+            except OSError:
+                pass
+        return snapshot
+
+
+def refresh_snapshot():
+    """
+    Синхронно оновлює знімок даних з Google Sheets і повертає його
+    Одночасні виклики не запускають окремих завантажень, а чекають на результат
+    вже запущеного (single-flight); з SHARED_SNAPSHOT - і між процесами
+    """
+    global _inflight_refresh
+    with _inflight_lock:
+        future = _inflight_refresh
+        leader = future is None
+        if leader:
+            future = _inflight_refresh = Future()
+    
+    if not leader:
+        return future.result()
+    
+    try:
+        snapshot = _refresh_shared() if SHARED_SNAPSHOT and SNAPSHOT_PATH else _refresh_and_save()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(snapshot)
+        return snapshot
+    finally:
+        with _inflight_lock:
+            _inflight_refresh = None
+
+
+def _open_shared_snapshot():
+    """
+    Відкриває файл спільного знімка; refreshed_at - час зміни файлу
+    (тобто останньої спроби оновлення будь-яким воркером)
+    """
+    global _shared_file_id
+    try:
+        stat = os.stat(SNAPSHOT_PATH)
+    except OSError:
+        return None
+    snapshot = load_snapshot(SNAPSHOT_PATH)
+    if snapshot is None:
+        return None
+    snapshot['refreshed_at'] = stat.st_mtime
+    _shared_file_id = (stat.st_dev, stat.st_ino)
+    return snapshot
+
+
+def _check_shared_snapshot(force=False):
+    """Підхоплює новіший файл спільного знімка, записаний іншим воркером"""
+    global _shared_checked_at
+    now = time.time()
+    if not force and now - _shared_checked_at < SHARED_CHECK_INTERVAL:
+        return
+    if not _shared_check_lock.acquire(blocking=force):
+        return
+    try:
+        _shared_checked_at = now
+        try:
+            stat = os.stat(SNAPSHOT_PATH)
+        except OSError:
+            return
         
-        if production_dict:
-            print(f"✓ Завантажено дані виробітку для {len(production_dict)} станцій з Google Sheets")
-            return filter_production_data(production_dict, station_ids, start_date, end_date)
-        else:
-            print("⚠ Не вдалося розпарсити дані, використовуються резервні")
-            return filter_production_data(FALLBACK_PRODUCTION, station_ids, start_date, end_date)
-            
-    except HttpError as e:
-        print(f"⚠ Помилка API: {e}")
-        return filter_production_data(FALLBACK_PRODUCTION, station_ids, start_date, end_date)
-    except Exception as e:
-        print(f"⚠ Помилка завантаження: {e}")
-        return filter_production_data(FALLBACK_PRODUCTION, station_ids, start_date, end_date)
+        if (stat.st_dev, stat.st_ino) != _shared_file_id:
+            # os.replace створює новий файл - новий inode
+            snapshot = _open_shared_snapshot()
+            if snapshot is not None:
+                _install_snapshot(snapshot)
+        elif _snapshot is not None and stat.st_mtime > _snapshot['refreshed_at']:
+            # Той самий файл, але відмічена нова спроба оновлення
+            _install_snapshot(dict(_snapshot, refreshed_at=stat.st_mtime))
+    finally:
+        _shared_check_lock.release()
+
+
+def _load_disk_snapshot():
+    """
+    Знімок з диска для холодного старту; refreshed_at = 0, тому одразу
+    після відкриття запускається фонове оновлення з Google Sheets
+    (для спільного знімка - час зміни файлу: оновлює лише той воркер, що помітить застарілість)
+    """
+    if not SNAPSHOT_PATH or not API_KEY or not get_sources():
+        return None
+    
+    if SHARED_SNAPSHOT:
+        snapshot = _open_shared_snapshot()
+    else:
+        snapshot = load_snapshot(SNAPSHOT_PATH)
+        if snapshot is not None:
+            snapshot['refreshed_at'] = 0
+    if snapshot is None:
+        return None
+    
+    print(f"✓ Відкрито знімок даних з диска ({len(snapshot['stations'])} станцій, {len(snapshot['store'].dates)} дат)")
+    return snapshot
+
+
+def _refresh_in_background():
+    """Запускає фонове оновлення знімка (не більше одного потоку одночасно)"""
+    global _refresh_thread
+    with _snapshot_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(target=refresh_snapshot, daemon=True)
+        _refresh_thread.start()
+
+
+def get_snapshot():
+    """
+    Повертає поточний знімок даних.
+    Перший виклик відкриває знімок з диска (або, якщо його немає, завантажує дані
+    синхронно); застарілий знімок віддається одразу, а свіжий завантажується
+    у фоновому потоці (stale-while-revalidate).
+    """
+    snapshot = _snapshot
+    
+    if snapshot is None:
+        CACHE_REQUESTS.inc(cache='snapshot', result='miss')
+        with _snapshot_lock:
+            if _snapshot is None:
+                disk_snapshot = _load_disk_snapshot()
+                if disk_snapshot is not None:
+                    _install_snapshot(disk_snapshot)
+                else:
+                    refresh_snapshot()
+            snapshot = _snapshot
+    elif SHARED_SNAPSHOT and SNAPSHOT_PATH and API_KEY and get_sources():
+        _check_shared_snapshot()
+        snapshot = _snapshot
+    
+    if time.time() - snapshot['refreshed_at'] > CACHE_TTL:
+        CACHE_REQUESTS.inc(cache='snapshot', result='stale')
+        _refresh_in_background()
+    else:
+        CACHE_REQUESTS.inc(cache='snapshot', result='hit')
+    
+    return snapshot
+
+
+def get_data_version():
+    """Версія поточного набору даних та час останньої синхронізації: (version, synced_at)"""
+    snapshot = get_snapshot()
+    return snapshot['version'], snapshot['synced_at']
+
+
+def wait_for_data_change(version, timeout):
+    """Чекає до timeout секунд, поки версія даних не стане відмінною від version"""
+    with _version_changed:
+        return _version_changed.wait_for(
+            lambda: _snapshot is not None and _snapshot['version'] != version,
+            timeout
+        )
+
+
+def get_all_stations():
+    """Отримує список всіх станцій з Google Sheets або резервних даних"""
+    return get_snapshot()['stations']
+
+
+# Роздільна здатність даних для графіків
+RESOLUTIONS = ('day', 'week', 'month')
+
+# Внутрішньодобові інтервали /api/production: назва -> хвилин
+INTRADAY_RESOLUTIONS = {'15min': 15, 'hour': 60}
+
+
+def get_production_data(station_ids=None, start_date=None, end_date=None, resolution='day', max_points=None):
+    """
+    Отримує дані виробітку для вибраних станцій за період
+    resolution - day / week / month (для week/month значення - сума за інтервал)
+    max_points - максимальна кількість точок на станцію (прорідження LTTB)
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'Невідома роздільна здатність: {resolution}')
+    
+    store = get_snapshot()['store']
+    if resolution == 'day':
+        production_data = store.to_records(station_ids, start_date, end_date)
+    else:
+        production_data = store.resample(station_ids, resolution, start_date, end_date)
+    
+    if max_points:
+        for station_id, records in production_data.items():
+            if len(records) > max_points:
+                points = [
+                    (date.fromisoformat(record['date']).toordinal(), record['production_kwh'], record)
+                    for record in records
+                ]
+                production_data[station_id] = [point[2] for point in lttb(points, max_points)]
+    
+    return production_data
+
+
+def get_production_columns(station_ids=None, start_date=None, end_date=None, resolution='day', max_points=None):
+    """
+    Ті самі дані, що й get_production_data, у колонковому вигляді:
+    {'dates': [...], 'series': {station_id: [значення або None, ...]}} - вісь дат передається
+    один раз, значення станцій вирівняні з нею (None - немає даних)
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'Невідома роздільна здатність: {resolution}')
+    
+    store = get_snapshot()['store']
+    if resolution == 'day':
+        # Без агрегації колонки беруться прямо зі сховища
+        dates, series = store.to_columns(station_ids, start_date, end_date)
+    else:
+        dates, series = records_to_columns(store.resample(station_ids, resolution, start_date, end_date))
+    if max_points:
+        dates, series = thin_columns(
+            dates, series, max_points, [date.fromisoformat(date_str).toordinal() for date_str in dates]
+        )
+    return {'dates': dates, 'series': series}
+
+
+def get_intraday_data(station_ids=None, start_date=None, end_date=None, resolution='15min', max_points=None, columnar=False):
+    """
+    Внутрішньодобові дані виробітку за період (не довший за INTRADAY_MAX_DAYS)
+    Формат той самий, що й у get_production_data / get_production_columns,
+    але 'date' - початок інтервалу 'YYYY-MM-DD HH:MM', значення - сума за інтервал
+    """
+    if resolution not in INTRADAY_RESOLUTIONS:
+        raise ValueError(f'Невідома роздільна здатність: {resolution}')
+    intraday = get_intraday_store()
+    if intraday is None:
+        raise ValueError('Внутрішньодобові дані не налаштовано')
+    
+    start_str, end_str = to_date_str(start_date), to_date_str(end_date)
+    if not start_str or not end_str:
+        date_range = intraday.date_range(station_ids)
+        if date_range is None:
+            return {'dates': [], 'series': {}} if columnar else {}
+        end_str = end_str or date_range[1]
+        start_str = start_str or (date.fromisoformat(end_str) - timedelta(days=INTRADAY_MAX_DAYS - 1)).isoformat()
+    if (date.fromisoformat(end_str) - date.fromisoformat(start_str)).days + 1 > INTRADAY_MAX_DAYS:
+        raise ValueError(f'Період внутрішньодобових даних не може перевищувати {INTRADAY_MAX_DAYS} днів')
+    
+    timestamps, series = intraday.columns(station_ids, start_str, end_str, INTRADAY_RESOLUTIONS[resolution])
+    if columnar:
+        if max_points:
+            timestamps, series = thin_columns(timestamps, series, max_points, [
+                date.fromisoformat(timestamp[:10]).toordinal() * 1440 + int(timestamp[11:13]) * 60 + int(timestamp[14:16])
+                for timestamp in timestamps
+            ])
+        return {'dates': timestamps, 'series': series}
+    
+    production_data = {
+        station_id: [
+            {'date': timestamp, 'production_kwh': value}
+            for timestamp, value in zip(timestamps, values) if value is not None
+        ]
+        for station_id, values in series.items()
+    }
+    if max_points:
+        for station_id, records in production_data.items():
+            if len(records) > max_points:
+                points = [
+                    (date.fromisoformat(record['date'][:10]).toordinal() * 1440
+                     + int(record['date'][11:13]) * 60 + int(record['date'][14:16]),
+                     record['production_kwh'], record)
+                    for record in records
+                ]
+                production_data[station_id] = [point[2] for point in lttb(points, max_points)]
+    
+    return production_data
+
+
+def get_production_delta(since, station_ids=None, start_date=None):
+    """
+    Зміни даних виробітку після версії since:
+    {'version', 'since', 'full_reload', 'data': {station_id: [{'date', 'production_kwh'}, ...]}}
+    production_kwh = None - дані за день видалено. full_reload = True, якщо версії since
+    немає в журналі або змінився склад станцій - тоді клієнт завантажує дані заново.
+    start_date - зміни раніше цієї дати не повертаються
+    """
+    version = get_snapshot()['version']
+    result = {'version': version, 'since': since, 'full_reload': False, 'data': {}}
+    if since == version:
+        return result
+    
+    # Ланцюжок змін від since до поточної версії (у журналі - від старих до нових)
+    entries = list(_delta_log)
+    chain = []
+    current = version
+    for from_version, to_version, changes in reversed(entries):
+        if to_version != current:
+            continue
+        if changes is None:
+            break
+        chain.append(changes)
+        current = from_version
+        if current == since:
+            break
+    
+    if current != since:
+        result['full_reload'] = True
+        return result
+    
+    merged = {}
+    for changes in reversed(chain):
+        for station_id, days in changes.items():
+            merged.setdefault(station_id, {}).update(days)
+    
+    start_str = to_date_str(start_date)
+    for station_id, days in merged.items():
+        if station_ids and station_id not in station_ids:
+            continue
+        records = [
+            {'date': date_str, 'production_kwh': production}
+            for date_str, production in sorted(days.items())
+            if not start_str or date_str >= start_str
+        ]
+        if records:
+            result['data'][station_id] = records
+    return result
 
 
 def filter_production_data(production_dict, station_ids, start_date, end_date):
@@ -291,55 +1337,201 @@ def filter_production_data(production_dict, station_ids, start_date, end_date):
     return filtered
 
 
-def get_available_date_range():
-    """Повертає доступний діапазон дат з даних"""
-    # Спочатку пробуємо завантажити з Google Sheets
-    production_data = get_production_data()
+# Групування для зведення виробітку
+SUMMARY_GROUPS = ('station', 'pair', 'location', 'fleet')
+
+
+def _summary_groups(stations, store, group_by, station_ids):
+    """Повертає список груп (key, name, [station_id, ...]) для зведення"""
+    selected = [sid for sid in (station_ids or store.station_ids()) if sid in store.series]
+    selected_set = set(selected)
     
-    if not production_data:
-        # Якщо немає даних, повертаємо діапазон з резервних даних
-        return {
-            'min_date': '2021-10-11',
-            'max_date': '2024-10-10'
+    if group_by == 'station':
+        names = {s['station_id']: s['station_name'] for s in stations}
+        return [(sid, names.get(sid, sid), [sid]) for sid in selected]
+    
+    if group_by == 'fleet':
+        return [('fleet', 'Всі станції', selected)]
+    
+    field = 'station_pair' if group_by == 'pair' else 'location'
+    groups = {}
+    for station in stations:
+        if station['station_id'] in selected_set:
+            groups.setdefault(station[field], []).append(station['station_id'])
+    return [(key, key, members) for key, members in groups.items()]
+
+
+def get_production_summary(group_by='station', bucket=None, station_ids=None, start_date=None, end_date=None):
+    """
+    Зведення виробітку (сума, середнє, суми по інтервалах) без передачі щоденних даних
+    group_by: station / pair / location / fleet; bucket: day / week / month / year або None
+    Суми беруться з кумулятивних сум сховища, тому не залежать від довжини періоду
+    """
+    if group_by not in SUMMARY_GROUPS:
+        raise ValueError(f'Невідоме групування: {group_by}')
+    if bucket is not None and bucket not in BUCKETS:
+        raise ValueError(f'Невідомий інтервал: {bucket}')
+    
+    snapshot = get_snapshot()
+    store = snapshot['store']
+    
+    summary = []
+    for key, name, members in _summary_groups(snapshot['stations'], store, group_by, station_ids):
+        total_kwh, station_days = store.total(members, start_date, end_date)
+        group = {
+            'key': key,
+            'name': name,
+            'station_ids': members,
+            'total_kwh': round(total_kwh, 2),
+            'station_days': station_days,
+            'average_kwh': round(total_kwh / station_days, 2) if station_days else 0.0
         }
+        if bucket:
+            group['buckets'] = [
+                {
+                    'period': period,
+                    'start': store.dates[lo],
+                    'end': store.dates[hi - 1],
+                    'total_kwh': round(period_kwh, 2),
+                    'station_days': period_days
+                }
+                for period, lo, hi, period_kwh, period_days
+                in store.bucket_totals(members, bucket, start_date, end_date)
+            ]
+        summary.append(group)
+    
+    return summary
+
+
+def _get_analytics():
+    """Аналітика поточного знімка; розраховується один раз на версію даних"""
+    global _analytics
+    snapshot = get_snapshot()
+    cached = _analytics
+    if cached is None or cached[0] != snapshot['version']:
+        with _analytics_lock:
+            cached = _analytics
+            if cached is None or cached[0] != snapshot['version']:
+                with ANALYTICS_DURATION.time():
+                    cached = (snapshot['version'], compute_analytics(snapshot['stations'], snapshot['store']))
+                _analytics = cached
+    return cached[1]
+
+
+def get_station_analytics(bucket='month', station_ids=None, start_date=None, end_date=None):
+    """
+    Питомий виробіток (кВт·год/кВт) та КВВП станцій по періодах
+    bucket: month / year / all; повертає {station_id: [{'period', 'start', 'end', ...}, ...]}
+    """
+    if bucket not in ANALYTICS_BUCKETS:
+        raise ValueError(f'Невідомий інтервал: {bucket}')
+    
+    periods = _get_analytics()['stations'][bucket]
+    start_str, end_str = to_date_str(start_date), to_date_str(end_date)
+    return {
+        station_id: filter_periods(periods[station_id], start_str, end_str)
+        for station_id in (station_ids or periods)
+        if station_id in periods
+    }
+
+
+def get_pair_analytics(bucket='month', pairs=None, start_date=None, end_date=None):
+    """Порівняння станцій у парах (A/B) по періодах: {pair: {'station_ids', 'periods'}}"""
+    if bucket not in ANALYTICS_BUCKETS:
+        raise ValueError(f'Невідомий інтервал: {bucket}')
     
-    all_dates = []
-    for station_data in production_data.values():
-        for record in station_data:
-            all_dates.append(record['date'])
+    pair_periods = _get_analytics()['pairs'][bucket]
+    start_str, end_str = to_date_str(start_date), to_date_str(end_date)
+    return {
+        pair: {
+            'station_ids': item['station_ids'],
+            'periods': filter_periods(item['periods'], start_str, end_str)
+        }
+        for pair, item in pair_periods.items()
+        if not pairs or pair in pairs
+    }
+
+
+def get_anomalies(station_ids=None, start_date=None, active_only=False):
+    """Періоди недовиробітку станцій (нові спочатку) та параметри їх пошуку"""
+    analytics = _get_analytics()
+    start_str = to_date_str(start_date)
+    events = [
+        event for event in analytics['anomalies']
+        if (not station_ids or event['station_id'] in station_ids)
+        and (not start_str or event['end'] >= start_str)
+        and (not active_only or event['active'])
+    ]
+    return {
+        'window_days': analytics['anomaly_window'],
+        'threshold': analytics['anomaly_threshold'],
+        'anomalies': events
+    }
+
+
+def get_available_date_range():
+    """Повертає доступний діапазон дат з даних"""
+    date_range = get_snapshot()['store'].date_range()
     
-    if all_dates:
+    if date_range:
         return {
-            'min_date': min(all_dates),
-            'max_date': max(all_dates)
+            'min_date': date_range[0],
+            'max_date': date_range[1]
         }
     else:
+        # Якщо немає даних, повертаємо діапазон з резервних даних
         return {
             'min_date': '2021-10-11',
             'max_date': '2024-10-10'
         }
 
 
+def find_stations(filters=None, bbox=None, near=None, limit=None, max_km=None):
+    """
+    Пошук станцій за індексами реєстру
+    filters - {поле з INDEXED_FIELDS: [значення, ...]} (умови полів поєднуються через І)
+    bbox    - (min_lat, min_lon, max_lat, max_lon)
+    near    - (lat, lon): найближчі станції (limit штук, не далі max_km),
+              відсортовані за відстанню, з полем distance_km
+    """
+    registry = get_snapshot()['registry']
+    
+    station_ids = registry.in_bbox(*bbox) if bbox else None
+    stations = registry.filter(station_ids, **(filters or {}))
+    
+    if near:
+        nearest = registry.nearest(
+            near[0], near[1], limit or len(stations), max_km,
+            station_ids=[s['station_id'] for s in stations]
+        )
+        return [dict(registry.get(station_id), distance_km=round(distance, 2)) for station_id, distance in nearest]
+    
+    return stations[:limit] if limit else stations
+
+
+def get_sources_status():
+    """
+    Стан джерел даних: остання синхронізація кожної таблиці (ok / stale / failed)
+    та конфлікти ID станцій між джерелами; ID таблиць скорочено
+    """
+    snapshot = get_snapshot()
+    return {
+        'source': snapshot['source'],
+        'synced_at': snapshot['synced_at'],
+        'refreshed_at': snapshot['refreshed_at'],
+        'sources': [
+            dict(status, spreadsheet_id=status['spreadsheet_id'][:6] + '…')
+            for status in snapshot.get('sources') or ()
+        ],
+        'conflicts': snapshot.get('conflicts') or []
+    }
+
+
 def get_station_by_id(station_id):
     """Отримує дані конкретної станції за ID"""
-    stations = get_all_stations()
-    for station in stations:
-        if station['station_id'] == station_id:
-            return station
-    return None
+    return get_snapshot()['registry'].get(station_id)
 
 
 def get_statistics():
-    """Отримує загальну статистику по всіх станціях"""
-    stations = get_all_stations()
-    
-    total_capacity = sum(s['total_capacity_kw'] for s in stations)
-    locations = set(s['location'] for s in stations)
-    monitoring_systems = set(s['monitoring_system'] for s in stations)
-    
-    return {
-        'total_stations': len(stations),
-        'total_capacity_kw': total_capacity,
-        'total_locations': len(locations),
-        'total_monitoring_systems': len(monitoring_systems)
-    }
+    """Отримує загальну статистику по всіх станціях (розрахована при побудові реєстру)"""
+    return dict(get_snapshot()['registry'].statistics)
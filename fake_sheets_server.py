@@ -0,0 +1,280 @@
+"""
+Локальний замінник Google Sheets API для розробки та перевірок без мережі
+Підтримує spreadsheets.get (розміри листів), values.get та values.batchGet
+з A1-діапазонами (значення - рядки, як FORMATTED_VALUE у справжньому API).
+
+Запуск:
+    python fake_sheets_server.py --port 8765 --days 1096
+і далі для додатку:
+    GOOGLE_API_KEY=fake SPREADSHEET_ID=fake SHEETS_API_ENDPOINT=http://127.0.0.1:8765/ python run.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+STATIONS_SHEET = 'Станции и оборудование'
+PRODUCTION_SHEET = 'Выработка энергии'
+
+# Колонки листа станцій (A-Q) у порядку таблиці
+STATION_COLUMNS = [
+    'station_id', 'station_name', 'station_pair', 'location', 'latitude', 'longitude',
+    'commissioning_date', 'total_capacity_kw', 'panel_type', 'panel_power_w', 'panel_count',
+    'inverter_brand', 'inverter_model', 'inverter_count', 'inverter_power_kw',
+    'mounting_type', 'monitoring_system'
+]
+
+_CELL_RE = re.compile(r'^([A-Z]*)(\d*)$')
+
+
+def column_index(letters):
+    """'A' -> 0, 'Z' -> 25, 'AA' -> 26"""
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+
+def parse_a1_range(range_name):
+    """
+    "'Лист'!D1:ZZ1" -> ('Лист', row0, row1, col0, col1) з індексами від 0, кінець не включно
+    Відсутні межі (A2:R, 1:1, A:A, 'Лист') означають "до кінця"
+    """
+    if '!' in range_name:
+        sheet, cells = range_name.rsplit('!', 1)
+    else:
+        sheet, cells = range_name, ''
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+
+    row0, row1, col0, col1 = 0, None, 0, None
+    if cells:
+        start, _, end = cells.partition(':')
+        end = end or start
+        start_match, end_match = _CELL_RE.match(start.upper()), _CELL_RE.match(end.upper())
+        if not start_match or not end_match:
+            raise ValueError(f'Unable to parse range: {range_name}')
+        if start_match.group(1):
+            col0 = column_index(start_match.group(1))
+        if start_match.group(2):
+            row0 = int(start_match.group(2)) - 1
+        if end_match.group(1):
+            col1 = column_index(end_match.group(1)) + 1
+        if end_match.group(2):
+            row1 = int(end_match.group(2))
+    return sheet, row0, row1, col0, col1
+
+
+def build_sample_sheets(stations, start_date='2021-10-11', days=1096, inverter_rows=3,
+                        blank_rate=0.02, seed=42):
+    """
+    Генерує вміст двох листів у форматі робочої таблиці:
+    станції (рядок заголовків + рядок на станцію) та горизонтальний лист виробітку
+    (дати в колонках D..., по inverter_rows рядків інверторів на станцію,
+    десяткова кома та випадкові порожні клітинки)
+    """
+    rng = random.Random(seed)
+
+    stations_grid = [STATION_COLUMNS]
+    for station in stations:
+        stations_grid.append([
+            str(station[column]).replace('.', ',') if column in ('latitude', 'longitude', 'inverter_power_kw')
+            else str(station[column])
+            for column in STATION_COLUMNS
+        ])
+
+    first_day = datetime.strptime(start_date, '%Y-%m-%d')
+    dates = [(first_day + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+    production_grid = [['Інвертор', 'ID станції', 'Модель'] + dates]
+
+    for station in stations:
+        per_inverter = station['total_capacity_kw'] * 1.3 / inverter_rows
+        for n in range(1, inverter_rows + 1):
+            row = [f'{station["station_id"]}-INV{n}', station['station_id'], station['inverter_model']]
+            for _ in dates:
+                if rng.random() < blank_rate:
+                    row.append('')
+                else:
+                    value = per_inverter + rng.uniform(-0.2, 0.2) * per_inverter
+                    row.append(f'{value:.1f}'.replace('.', ','))
+            production_grid.append(row)
+
+    return {STATIONS_SHEET: stations_grid, PRODUCTION_SHEET: production_grid}
+
+
+class FakeSheetsServer:
+    """
+    HTTP-сервер, що відповідає як Google Sheets API v4 на даних sheets = {назва листа: рядки}
+    spreadsheets  - кілька таблиць {spreadsheet_id: sheets} (для перевірки SHEETS_SOURCES);
+                    інші ID отримують sheets, а якщо sheets=None - 404
+    latency       - штучна затримка кожної відповіді, секунд
+    latencies     - додаткова затримка для окремих таблиць {spreadsheet_id: секунд}
+    fail_requests - скільки наступних запитів отримають 503 (для перевірки повторів)
+    """
+
+    def __init__(self, sheets, host='127.0.0.1', port=0, latency=0.0, spreadsheets=None, latencies=None):
+        self.sheets = sheets
+        self.spreadsheets = spreadsheets or {}
+        self.latency = latency
+        self.latencies = latencies or {}
+        self.fail_requests = 0
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def sheets_for(self, spreadsheet_id):
+        """Листи таблиці spreadsheet_id (None - таблиці немає)"""
+        return self.spreadsheets.get(spreadsheet_id, self.sheets)
+
+    def read_range(self, range_name, spreadsheet_id=None):
+        """Значення діапазону як у відповіді API (без порожніх хвостів рядків)"""
+        sheets = self.sheets_for(spreadsheet_id)
+        sheet, row0, row1, col0, col1 = parse_a1_range(range_name)
+        if sheet not in sheets:
+            raise ValueError(f'Unable to parse range: {range_name}')
+
+        values = []
+        for row in sheets[sheet][row0:row1]:
+            cells = [str(cell) for cell in row[col0:col1]]
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def metadata(self, spreadsheet_id, ranges=()):
+        """Відповідь spreadsheets.get: назви та розміри листів"""
+        sheets = self.sheets_for(spreadsheet_id)
+        titles = [parse_a1_range(name)[0] for name in ranges] or list(sheets)
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'sheets': [
+                {'properties': {
+                    'title': title,
+                    'gridProperties': {
+                        'rowCount': len(sheets[title]),
+                        'columnCount': max((len(row) for row in sheets[title]), default=0)
+                    }
+                }}
+                for title in titles if title in sheets
+            ]
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _error(self, status, message, reason):
+                self._send(status, {'error': {'code': status, 'message': message, 'status': reason}})
+
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                    fail = server.fail_requests > 0
+                    if fail:
+                        server.fail_requests -= 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if fail:
+                    return self._error(503, 'The service is currently unavailable.', 'UNAVAILABLE')
+
+                parts = urlsplit(self.path)
+                path = unquote(parts.path)
+                query = parse_qs(parts.query)
+
+                match = re.match(r'^/v4/spreadsheets/([^/:]+)', path)
+                if match:
+                    if server.latencies.get(match.group(1)):
+                        time.sleep(server.latencies[match.group(1)])
+                    if server.sheets_for(match.group(1)) is None:
+                        return self._error(404, 'Requested entity was not found.', 'NOT_FOUND')
+
+                match = re.match(r'^/v4/spreadsheets/([^/:]+)$', path)
+                if match:
+                    return self._send(200, server.metadata(match.group(1), query.get('ranges', [])))
+
+                match = re.match(r'^/v4/spreadsheets/([^/]+)/values(?::batchGet|/(.+))$', path)
+                if not match:
+                    return self._error(404, f'Not found: {path}', 'NOT_FOUND')
+
+                spreadsheet_id, range_name = match.groups()
+                try:
+                    if range_name is None:
+                        value_ranges = [
+                            {'range': name, 'majorDimension': 'ROWS', 'values': server.read_range(name, spreadsheet_id)}
+                            for name in query.get('ranges', [])
+                        ]
+                        for value_range in value_ranges:
+                            if not value_range['values']:
+                                del value_range['values']
+                        return self._send(200, {'spreadsheetId': spreadsheet_id, 'valueRanges': value_ranges})
+
+                    payload = {'range': range_name, 'majorDimension': 'ROWS'}
+                    values = server.read_range(range_name, spreadsheet_id)
+                    if values:
+                        payload['values'] = values
+                    return self._send(200, payload)
+                except ValueError as e:
+                    return self._error(400, str(e), 'INVALID_ARGUMENT')
+
+        return Handler
+
+    def start(self):
+        """Запускає сервер у фоновому потоці"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальний замінник Google Sheets API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--days', type=int, default=1096, help='кількість колонок з датами')
+    parser.add_argument('--inverters', type=int, default=3, help='рядків інверторів на станцію')
+    parser.add_argument('--latency', type=float, default=0.0, help='затримка відповіді, секунд')
+    args = parser.parse_args()
+
+    from data_parser import FALLBACK_STATIONS
+    sheets = build_sample_sheets(FALLBACK_STATIONS, days=args.days, inverter_rows=args.inverters)
+    server = FakeSheetsServer(sheets, args.host, args.port, args.latency)
+    print(f"✓ Тестовий Google Sheets API: {server.url}")
+    print(f"  SHEETS_API_ENDPOINT={server.url} GOOGLE_API_KEY=fake SPREADSHEET_ID=fake")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""
+Сховище внутрішньодобових даних виробітку (15-хвилинні / погодинні показники інверторів)
+Ряд кожної станції поділено на місячні блоки array('f') (float32, NaN - немає показника):
+31 день x 96 інтервалів = ~12 КБ на станцію-місяць замість словника на кожен запис.
+Блоки зберігаються у файлах <directory>/<station_id>/<YYYY-MM>.f32; у пам'яті тримаються
+лише останні використані (hot_chunks), решта ("холодні") читаються з диска при першому
+зверненні. Денні суми рахуються згорткою блоку при його завантаженні/зміні й кешуються
+окремо - вони в interval разів менші, тож для денних даних блоки не потрібні в пам'яті.
+
+Дані імпортуються з CSV (вивантаження систем моніторингу): station_id, початок інтервалу
+('YYYY-MM-DD HH:MM' або ISO 8601), виробіток за інтервал у кВт·год; роздільник "," або ";",
+десяткова кома допускається; рядок заголовка необов'язковий.
+"""
+import calendar
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date, timedelta
+from urllib.parse import quote, unquote
+
+from production_store import NAN
+
+# Тривалість одного інтервалу, хвилин (має ділити добу без остачі)
+INTRADAY_INTERVAL = int(os.getenv('INTRADAY_INTERVAL', '15'))
+
+# Скільки місячних блоків тримати в пам'яті (решта читається з диска за потреби)
+INTRADAY_HOT_CHUNKS = int(os.getenv('INTRADAY_HOT_CHUNKS', '512'))
+
+# Файл з переліком імпортованих CSV та номером ревізії даних
+MANIFEST = 'manifest.json'
+
+
+def _parse_value(text):
+    text = text.strip().replace(' ', '').replace(',', '.')
+    return float(text) if text else NAN
+
+
+def _parse_timestamp(text):
+    """'YYYY-MM-DD HH:MM[:SS]' або 'YYYY-MM-DDTHH:MM...' -> ('YYYY-MM-DD', хвилина доби)"""
+    text = text.strip()
+    date.fromisoformat(text[:10])
+    if len(text) < 16 or text[10] not in ' T' or text[13] != ':':
+        raise ValueError(f'Невірний час: {text}')
+    hour, minute = int(text[11:13]), int(text[14:16])
+    # '24:00' (кінець доби) та подібні позначки не переносяться на наступний день
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f'Невірний час: {text}')
+    return text[:10], hour * 60 + minute
+
+
+class IntradayStore:
+    """
+    Внутрішньодобові ряди станцій у місячних блоках float32
+    Блок (station_id, 'YYYY-MM') - масив днів_у_місяці x slots значень,
+    де slots = 1440 / interval_minutes; індекс = (день - 1) * slots + інтервал
+    """
+
+    def __init__(self, directory, interval_minutes=INTRADAY_INTERVAL, hot_chunks=INTRADAY_HOT_CHUNKS):
+        if 1440 % interval_minutes:
+            raise ValueError('Інтервал має ділити добу без остачі')
+        self.directory = directory
+        self.interval = interval_minutes
+        self.slots = 1440 // interval_minutes
+        self.hot_chunks = max(hot_chunks, 1)
+        self._lock = threading.RLock()
+        self._hot = OrderedDict()
+        self._dirty = set()
+        self._daily = {}
+        self._months = {}
+        self._imported = {}
+        self.revision = 0
+        self._manifest_mtime = None
+        self._scan()
+
+    # --- файли ---
+
+    def _station_dir(self, station_id):
+        return os.path.join(self.directory, quote(station_id, safe=''))
+
+    def _chunk_path(self, station_id, month):
+        return os.path.join(self._station_dir(station_id), f'{month}.f32')
+
+    def _scan(self):
+        """Індекс наявних блоків на диску та стан імпорту з маніфесту"""
+        self._months = {}
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_dir():
+                    months = sorted(name[:-4] for name in os.listdir(entry.path) if name.endswith('.f32'))
+                    if months:
+                        self._months[unquote(entry.name)] = months
+        manifest_path = os.path.join(self.directory, MANIFEST)
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            self._manifest_mtime = os.stat(manifest_path).st_mtime
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get('interval', self.interval) != self.interval:
+            raise ValueError(f'Дані у {self.directory} записано з іншим інтервалом ({manifest["interval"]} хв)')
+        self._imported = {path: tuple(signature) for path, signature in manifest.get('imported', {}).items()}
+        self.revision = manifest.get('revision', 0)
+
+    def reload_if_changed(self):
+        """
+        Підхоплює дані, записані іншим процесом (маніфест оновлюється після кожного імпорту)
+        Повертає True, якщо кеші скинуто
+        """
+        try:
+            mtime = os.stat(os.path.join(self.directory, MANIFEST)).st_mtime
+        except OSError:
+            return False
+        with self._lock:
+            if mtime == self._manifest_mtime or self._dirty:
+                return False
+            self._hot.clear()
+            self._daily.clear()
+            self._scan()
+            return True
+
+    def _write_atomic(self, path, write):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _save_chunk(self, key, values):
+        # На диску - завжди little-endian, щоб файли читались на будь-якій машині
+        if sys.byteorder == 'big':
+            values = array('f', values)
+            values.byteswap()
+        self._write_atomic(self._chunk_path(*key), values.tofile)
+
+    def flush(self):
+        """Записує змінені блоки та маніфест на диск"""
+        with self._lock:
+            for key in sorted(self._dirty):
+                self._save_chunk(key, self._hot[key])
+            self._dirty.clear()
+            manifest = json.dumps({
+                'interval': self.interval,
+                'revision': self.revision,
+                'imported': self._imported
+            }, ensure_ascii=False).encode('utf-8')
+            self._write_atomic(os.path.join(self.directory, MANIFEST), lambda f: f.write(manifest))
+            self._manifest_mtime = os.stat(os.path.join(self.directory, MANIFEST)).st_mtime
+
+    # --- блоки ---
+
+    def _chunk_size(self, month):
+        year, month_number = int(month[:4]), int(month[5:7])
+        return calendar.monthrange(year, month_number)[1] * self.slots
+
+    def _chunk(self, station_id, month, create=False):
+        """Блок з пам'яті або з диска (None, якщо його немає і create=False)"""
+        key = (station_id, month)
+        values = self._hot.get(key)
+        if values is not None:
+            self._hot.move_to_end(key)
+            return values
+
+        size = self._chunk_size(month)
+        values = array('f')
+        try:
+            with open(self._chunk_path(station_id, month), 'rb') as f:
+                values.fromfile(f, size)
+            if sys.byteorder == 'big':
+                values.byteswap()
+        except (OSError, EOFError):
+            if not create:
+                return None
+            values = array('f', [NAN]) * size
+            months = self._months.setdefault(station_id, [])
+            if month not in months:
+                months.append(month)
+                months.sort()
+
+        # Місце звільняється до додавання, щоб щойно завантажений блок залишився в пам'яті
+        self._evict(self.hot_chunks - 1)
+        self._hot[key] = values
+        if key not in self._daily:
+            self._daily[key] = self._rollup(values)
+        return values
+
+    def _evict(self, limit):
+        """Витісняє найдавніше використані блоки понад limit (змінені спершу записуються на диск)"""
+        while len(self._hot) > limit:
+            key, values = self._hot.popitem(last=False)
+            if key in self._dirty:
+                self._save_chunk(key, values)
+                self._dirty.discard(key)
+
+    def _rollup(self, values):
+        """Денні суми блоку (NaN - за день немає жодного показника)"""
+        slots = self.slots
+        result = array('d')
+        for lo in range(0, len(values), slots):
+            readings = [v for v in values[lo:lo + slots] if v == v]
+            result.append(round(sum(readings), 3) if readings else NAN)
+        return result
+
+    # --- запис ---
+
+    def add_many(self, records):
+        """
+        Записує показники: records - ітерабельне (station_id, 'YYYY-MM-DD', хвилина доби, кВт·год)
+        Повторний показник за той самий інтервал замінює попередній; повертає кількість записаних
+        """
+        # Групування по блоках: кожен блок завантажується й перераховується один раз
+        by_chunk = {}
+        for station_id, day, minute, value in records:
+            by_chunk.setdefault((station_id, day[:7]), []).append(
+                ((int(day[8:10]) - 1) * self.slots + minute // self.interval, value)
+            )
+
+        count = 0
+        with self._lock:
+            for (station_id, month), updates in sorted(by_chunk.items()):
+                values = self._chunk(station_id, month, create=True)
+                for position, value in updates:
+                    values[position] = value
+                self._daily[(station_id, month)] = self._rollup(values)
+                self._dirty.add((station_id, month))
+                count += len(updates)
+            if count:
+                self.revision += 1
+                self.flush()
+        return count
+
+    def import_csv(self, path):
+        """Імпортує один CSV файл; повертає кількість записаних показників"""
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            delimiter = ';' if sample.count(';') > sample.count(',') else ','
+            rows = []
+            rejected = 0
+            for number, row in enumerate(csv.reader(f, delimiter=delimiter)):
+                if len(row) < 3 or not row[0].strip():
+                    continue
+                try:
+                    day, minute = _parse_timestamp(row[1])
+                    if minute % self.interval:
+                        raise ValueError(f'Час не кратний {self.interval} хв: {row[1]}')
+                    rows.append((row[0].strip(), day, minute, _parse_value(row[2])))
+                except ValueError:
+                    # Рядок заголовка (перший) або пошкоджений рядок
+                    rejected += number > 0
+        if rejected:
+            print(f"⚠ {os.path.basename(path)}: пропущено {rejected} рядків з невірним часом або значенням")
+        return self.add_many(rows)
+
+    def import_directory(self, directory):
+        """
+        Імпортує нові та змінені (за розміром і часом зміни) CSV файли каталогу
+        Повертає кількість записаних показників
+        """
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.lower().endswith('.csv'))
+        except OSError:
+            return 0
+
+        total = 0
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if self._imported.get(path) == signature:
+                continue
+            try:
+                count = self.import_csv(path)
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
+                print(f"⚠ Не вдалося імпортувати {name}: {e}")
+                continue
+            with self._lock:
+                self._imported[path] = signature
+                self.flush()
+            print(f"✓ Імпортовано {count} внутрішньодобових показників з {name}")
+            total += count
+        return total
+
+    # --- читання ---
+
+    def station_ids(self):
+        """ID станцій з внутрішньодобовими даними"""
+        return list(self._months)
+
+    def date_range(self, station_ids=None):
+        """Перший та останній день з блоками даних (None, якщо даних немає)"""
+        months = [m for sid, ms in self._months.items() if not station_ids or sid in station_ids for m in ms]
+        if not months:
+            return None
+        last = max(months)
+        return f'{min(months)}-01', f'{last}-{calendar.monthrange(int(last[:4]), int(last[5:7]))[1]:02d}'
+
+    def daily_totals(self, station_id):
+        """Денні суми станції {'YYYY-MM-DD': кВт·год} (згортка, блоки підвантажуються лише раз)"""
+        result = {}
+        with self._lock:
+            for month in self._months.get(station_id, ()):
+                key = (station_id, month)
+                if key not in self._daily:
+                    self._chunk(station_id, month)
+                for day, total in enumerate(self._daily.get(key, ()), 1):
+                    if total == total:
+                        result[f'{month}-{day:02d}'] = total
+        return result
+
+    def columns(self, station_ids, start_date, end_date, interval_minutes=None):
+        """
+        Ряди за період [start_date, end_date] (рядки 'YYYY-MM-DD'), агреговані до interval_minutes
+        Повертає (timestamps 'YYYY-MM-DD HH:MM', {station_id: [кВт·год або None]});
+        інтервали без даних жодної станції на вісь не потрапляють
+        """
+        interval = interval_minutes or self.interval
+        if interval % self.interval or 1440 % interval:
+            raise ValueError(f'Інтервал має бути кратним {self.interval} хв і ділити добу')
+        step = interval // self.interval
+
+        first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        days = []
+        while first <= last:
+            days.append(first.isoformat())
+            first += timedelta(days=1)
+
+        selected = [sid for sid in station_ids or self.station_ids() if sid in self._months]
+        per_day = self.slots // step
+        columns = {sid: [None] * (len(days) * per_day) for sid in selected}
+        with self._lock:
+            for station_id in selected:
+                out = columns[station_id]
+                months = set(self._months[station_id])
+                for i, day in enumerate(days):
+                    if day[:7] not in months:
+                        continue
+                    chunk = self._chunk(station_id, day[:7])
+                    lo = (int(day[8:10]) - 1) * self.slots
+                    for j in range(per_day):
+                        readings = [v for v in chunk[lo + j * step:lo + (j + 1) * step] if v == v]
+                        if readings:
+                            out[i * per_day + j] = round(sum(readings), 3)
+
+        keep = [k for k in range(len(days) * per_day) if any(columns[sid][k] is not None for sid in selected)]
+        timestamps = [
+            f'{days[k // per_day]} {(k % per_day) * interval // 60:02d}:{(k % per_day) * interval % 60:02d}'
+            for k in keep
+        ]
+        return timestamps, {sid: [values[k] for k in keep] for sid, values in columns.items()}
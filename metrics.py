@@ -0,0 +1,268 @@
+"""
+Метрики додатку у текстовому форматі Prometheus (ендпоінт /metrics)
+Лічильники, гістограми та датчики з мітками без зовнішніх залежностей:
+затримки запитів по ендпоінтах, звернення до Google Sheets, час парсингу,
+кількість розібраних рядків/клітинок, переходи на резервні дані, влучання в кеші.
+
+Профілювання окремих запитів (cProfile) вмикається змінною середовища
+PROFILE_REQUESTS (наприклад "1" - усі запити або "/api/production" - лише шляхи
+з цим префіксом); профілі зберігаються в PROFILE_DIR (за замовчуванням .cache/profiles)
+"""
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Межі інтервалів гістограм затримок, секунд
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'profiles'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Базовий клас: значення зберігаються за кортежем міток"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def samples(self):
+        """[(суфікс назви, значення міток, додаткові мітки, значення), ...]"""
+        with self._lock:
+            return [('', key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for suffix, key, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.label_names, key, extra)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """Лічильник, що лише зростає"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Поточне значення (може як зростати, так і зменшуватись)"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Гістограма з кумулятивними інтервалами (_bucket, _sum, _count)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Вимірює тривалість блоку with"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    result.append(('_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+                result.append(('_sum', key, (), total))
+                result.append(('_count', key, (), count))
+        return result
+
+
+class Registry:
+    """Набір метрик процесу"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Усі метрики у текстовому форматі Prometheus 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# HTTP
+REQUEST_LATENCY = registry.register(Histogram(
+    'ses_http_request_duration_seconds', 'Тривалість обробки HTTP запиту', ('endpoint', 'method', 'status')
+))
+
+# Google Sheets
+SHEETS_REQUESTS = registry.register(Counter(
+    'ses_sheets_requests_total', 'Звернення до Google Sheets API', ('method',)
+))
+SHEETS_ERRORS = registry.register(Counter(
+    'ses_sheets_errors_total', 'Помилки звернень до Google Sheets API', ('method',)
+))
+SHEETS_LATENCY = registry.register(Histogram(
+    'ses_sheets_request_duration_seconds', 'Тривалість звернення до Google Sheets API', ('method',)
+))
+
+# Синхронізація та парсинг
+SYNC_DURATION = registry.register(Histogram(
+    'ses_sync_duration_seconds', 'Тривалість синхронізації з Google Sheets', ('mode',)
+))
+PARSE_DURATION = registry.register(Histogram(
+    'ses_parse_duration_seconds', 'Тривалість парсингу листів', ('sheet',)
+))
+ROWS_PARSED = registry.register(Counter(
+    'ses_rows_parsed_total', 'Розібрані рядки листів', ('sheet',)
+))
+CELLS_PARSED = registry.register(Counter(
+    'ses_cells_parsed_total', 'Розібрані клітинки листа виробітку', ()
+))
+ANALYTICS_DURATION = registry.register(Histogram(
+    'ses_analytics_duration_seconds', 'Тривалість розрахунку аналітики парку', ()
+))
+FALLBACK_ACTIVATIONS = registry.register(Counter(
+    'ses_fallback_activations_total', 'Переходи на резервні дані', ('reason',)
+))
+SOURCE_SYNCS = registry.register(Counter(
+    'ses_source_syncs_total', 'Синхронізації джерел (таблиць) за результатом', ('source', 'result')
+))
+SNAPSHOT_SYNCED_AT = registry.register(Gauge(
+    'ses_snapshot_synced_timestamp_seconds', 'Час останньої успішної синхронізації знімка (unix)', ('source',)
+))
+
+# Кеші
+CACHE_REQUESTS = registry.register(Counter(
+    'ses_cache_requests_total', 'Звернення до кешів', ('cache', 'result')
+))
+
+
+def render():
+    """Текст для ендпоінту /metrics"""
+    return registry.render()
+
+
+def _profile_enabled(path):
+    if not PROFILE_REQUESTS or PROFILE_REQUESTS == '0':
+        return False
+    return PROFILE_REQUESTS == '1' or path.startswith(PROFILE_REQUESTS)
+
+
+# cProfile не підтримує кілька одночасних профайлерів, тому профілюється
+# не більше одного запиту за раз (решта обробляються без профілювання)
+_profile_lock = threading.Lock()
+
+
+def init_app(app):
+    """Підключає вимірювання запитів (і, за потреби, профілювання) до Flask додатку"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request():
+        g.metrics_started = time.perf_counter()
+        if _profile_enabled(request.path) and _profile_lock.acquire(blocking=False):
+            g.metrics_profiler = cProfile.Profile()
+            g.metrics_profiler.enable()
+
+    @app.after_request
+    def _finish_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                endpoint=endpoint, method=request.method, status=response.status_code
+            )
+
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                name = request.path.strip('/').replace('/', '_') or 'index'
+                profiler.dump_stats(os.path.join(PROFILE_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{name}.prof'))
+            except OSError as e:
+                print(f"⚠ Не вдалося зберегти профіль запиту: {e}")
+        return response
+
+    @app.teardown_request
+    def _release_profiler(exc):
+        # Запит завершився винятком до after_request
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
@@ -0,0 +1,480 @@
+"""
+Колонкове сховище даних виробітку
+Одна спільна вісь дат + масив значень (float) на кожну станцію замість
+окремого словника на кожен день
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+# Відсутнє значення (день без даних для станції)
+NAN = float('nan')
+
+# Підтримувані інтервали агрегації
+BUCKETS = ('day', 'week', 'month', 'year')
+
+
+def bucket_key(date_str, bucket):
+    """Ключ інтервалу для дати: день, понеділок тижня, 'YYYY-MM' або 'YYYY'"""
+    if bucket == 'day':
+        return date_str
+    if bucket == 'month':
+        return date_str[:7]
+    if bucket == 'year':
+        return date_str[:4]
+    if bucket == 'week':
+        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+        return (date_obj - timedelta(days=date_obj.weekday())).strftime('%Y-%m-%d')
+    raise ValueError(f'Невідомий інтервал: {bucket}')
+
+
+def _prefix_sums(values):
+    """Кумулятивні суми (NaN = 0) та кількість днів з даними; довжина n + 1"""
+    sums = array('d', [0.0])
+    sums.extend(accumulate(v if v == v else 0.0 for v in values))
+    counts = array('q', [0])
+    counts.extend(accumulate(1 if v == v else 0 for v in values))
+    return sums, counts
+
+
+def lttb(points, threshold):
+    """
+    Прорідження ряду алгоритмом Largest-Triangle-Three-Buckets
+    points - список (x, y, payload); повертає не більше threshold точок,
+    зберігаючи першу, останню та візуально найважливіші (піки і провали)
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return points
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Середня точка наступного інтервалу
+        next_lo = int((i + 1) * bucket_size) + 1
+        next_hi = min(int((i + 2) * bucket_size) + 1, n)
+        next_points = points[next_lo:next_hi]
+        avg_x = sum(p[0] for p in next_points) / len(next_points)
+        avg_y = sum(p[1] for p in next_points) / len(next_points)
+
+        # Точка поточного інтервалу з найбільшою площею трикутника
+        lo = int(i * bucket_size) + 1
+        hi = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a][0], points[a][1]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def records_to_columns(production_dict):
+    """
+    {station_id: [{'date', 'production_kwh'}, ...]} -> (dates, {station_id: [значення або None]})
+    Спільна вісь - об'єднання дат усіх станцій
+    """
+    dates = sorted({record['date'] for records in production_dict.values() for record in records})
+    position = {date: i for i, date in enumerate(dates)}
+    columns = {}
+    for station_id, records in production_dict.items():
+        values = [None] * len(dates)
+        for record in records:
+            values[position[record['date']]] = record['production_kwh']
+        columns[station_id] = values
+    return dates, columns
+
+
+def thin_columns(dates, columns, max_points, x_values=None):
+    """
+    Прорідження колонкових даних до не більше max_points позицій, спільних для всіх станцій
+    Позиції обираються LTTB за сумарним рядом вибраних станцій, тож вісь не стає об'єднанням
+    окремо прорідених рядів з пропусками у кожного
+    x_values - координати позицій осі для LTTB (за замовчуванням - номери позицій)
+    """
+    if len(dates) <= max_points:
+        return dates, columns
+    if x_values is None:
+        x_values = range(len(dates))
+    totals = [0.0] * len(dates)
+    for values in columns.values():
+        totals = [total + value if value is not None else total for total, value in zip(totals, values)]
+    keep = [point[2] for point in lttb(list(zip(x_values, totals, range(len(dates)))), max_points)]
+    return [dates[i] for i in keep], {station_id: [values[i] for i in keep] for station_id, values in columns.items()}
+
+
+def to_date_str(value):
+    """Приводить дату (str або datetime/date) до рядка 'YYYY-MM-DD'"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime('%Y-%m-%d')
+
+
+class ProductionStore:
+    """
+    Дані виробітку у колонковому вигляді.
+    dates  - відсортований список дат 'YYYY-MM-DD' (спільний для всіх станцій)
+    series - {station_id: array('d')} (або memoryview того ж типу), вирівняні з dates;
+             NaN - немає даних
+
+    Кумулятивні суми рахуються один раз при створенні (тобто раз на синхронізацію),
+    тому сума та середнє за будь-який період - це O(1)
+    """
+
+    def __init__(self, dates, series, prefix=None):
+        self.dates = dates
+        self.series = series
+        # prefix - готові кумулятивні суми {station_id: (sums, counts)}, напр. зі знімка на диску;
+        # для станцій, яких там немає, вони рахуються тут
+        self._prefix = dict(prefix or {})
+        for station_id, values in series.items():
+            if station_id not in self._prefix:
+                self._prefix[station_id] = _prefix_sums(values)
+        self._group_prefix = {}
+        self._bucket_starts = {}
+
+    @classmethod
+    def from_daily_sums(cls, station_data):
+        """Будує сховище зі структури {station_id: {date: production_kwh}}"""
+        all_dates = set()
+        for days in station_data.values():
+            all_dates.update(days)
+        dates = sorted(all_dates)
+        date_index = {date: i for i, date in enumerate(dates)}
+
+        series = {}
+        for station_id, days in station_data.items():
+            values = array('d', [NAN]) * len(dates)
+            for date, production in days.items():
+                values[date_index[date]] = production
+            series[station_id] = values
+
+        return cls(dates, series)
+
+    @classmethod
+    def from_records(cls, production_dict):
+        """Будує сховище зі старого формату {station_id: [{'date', 'production_kwh'}, ...]}"""
+        return cls.from_daily_sums({
+            station_id: {record['date']: record['production_kwh'] for record in records}
+            for station_id, records in production_dict.items()
+        })
+
+    @classmethod
+    def merge(cls, parts):
+        """
+        Об'єднує кілька сховищ в одне: parts - [(префікс ID, store), ...]
+        Станції отримують ID префікс + station_id; вісь дат - об'єднання осей.
+        Якщо вісь частини збігається з загальною, її масиви та кумулятивні суми
+        використовуються без копіювання
+        """
+        axes = [store.dates for _, store in parts]
+        if all(axis == axes[0] for axis in axes[1:]):
+            dates = axes[0] if axes else []
+        else:
+            dates = sorted(set().union(*axes))
+
+        series, prefix = {}, {}
+        for name_prefix, store in parts:
+            if store.dates == dates:
+                for station_id, values in store.series.items():
+                    series[name_prefix + station_id] = values
+                    prefix[name_prefix + station_id] = store.prefix(station_id)
+                continue
+            positions = [bisect_left(dates, date) for date in store.dates]
+            for station_id, values in store.series.items():
+                merged = array('d', [NAN]) * len(dates)
+                for position, value in zip(positions, values):
+                    merged[position] = value
+                series[name_prefix + station_id] = merged
+
+        return cls(dates, series, prefix)
+
+    def with_days(self, dates, station_data):
+        """
+        Нове сховище, у якому дні dates замінено даними station_data ({station_id: {date: value}})
+        Використовується інкрементальною синхронізацією: нові дні після останньої
+        дати дописуються в кінець осі без її перебудови
+        """
+        existing = set(self.dates)
+        added = sorted({date for days in station_data.values() for date in days} - existing)
+
+        if not added or not self.dates or added[0] > self.dates[-1]:
+            # Звичайний випадок - нові дні лише в кінці
+            axis = self.dates + added
+            remap = None
+        else:
+            axis = sorted(existing.union(added))
+            remap = [bisect_left(axis, date) for date in self.dates]
+
+        positions = [(date, bisect_left(axis, date)) for date in dates if date in existing or date in added]
+        series = {}
+        for station_id in list(self.series) + [sid for sid in station_data if sid not in self.series]:
+            old_values = self.series.get(station_id)
+            if old_values is None:
+                values = array('d', [NAN]) * len(axis)
+            elif remap is None:
+                values = array('d', old_values)
+                values.extend(array('d', [NAN]) * len(added))
+            else:
+                values = array('d', [NAN]) * len(axis)
+                for i, position in enumerate(remap):
+                    values[position] = old_values[i]
+
+            days = station_data.get(station_id, {})
+            for date, position in positions:
+                values[position] = days.get(date, NAN)
+            series[station_id] = values
+
+        return ProductionStore(axis, series)
+
+    def overlay(self, station_data):
+        """
+        Нове сховище, у якому значення station_data ({station_id: {date: value}}) замінюють наявні
+        На відміну від with_days інші станції та дні не змінюються; нові дати додаються на вісь,
+        масиви станцій без змін використовуються без копіювання
+        """
+        existing = set(self.dates)
+        added = {date for days in station_data.values() for date in days} - existing
+        axis = sorted(existing.union(added)) if added else self.dates
+        remap = [bisect_left(axis, date) for date in self.dates] if added else None
+        position = {date: i for i, date in enumerate(axis)}
+
+        series, prefix = {}, {}
+        for station_id in list(self.series) + [sid for sid in station_data if sid not in self.series]:
+            old_values = self.series.get(station_id)
+            days = station_data.get(station_id)
+            if not days and remap is None:
+                series[station_id] = old_values
+                prefix[station_id] = self._prefix[station_id]
+                continue
+            if old_values is None:
+                values = array('d', [NAN]) * len(axis)
+            elif remap is None:
+                values = array('d', old_values)
+            else:
+                values = array('d', [NAN]) * len(axis)
+                for i, p in enumerate(remap):
+                    values[p] = old_values[i]
+            for date, value in (days or {}).items():
+                values[position[date]] = value
+            series[station_id] = values
+
+        return ProductionStore(axis, series, prefix)
+
+    def changes_since(self, previous):
+        """
+        Дні, додані або змінені відносно попереднього сховища:
+        {station_id: {date: production_kwh або None (дані видалено)}}
+        Повертає None, якщо змінився склад станцій (потрібне повне перезавантаження)
+        """
+        if set(previous.series) != set(self.series):
+            return None
+
+        n = len(previous.dates)
+        # Звичайний випадок - вісь дат лише подовжилась
+        appended = self.dates[:n] == previous.dates
+        if not appended:
+            position = {date: i for i, date in enumerate(self.dates)}
+
+        changes = {}
+        for station_id, values in self.series.items():
+            old_values = previous.series[station_id]
+            changed = {}
+            if appended:
+                # Незмінний ряд відсікається порівнянням байтів (NaN == NaN побітово)
+                if array('d', old_values).tobytes() != array('d', values[:n]).tobytes():
+                    for i in range(n):
+                        old, new = old_values[i], values[i]
+                        if old != new and (old == old or new == new):
+                            changed[self.dates[i]] = new if new == new else None
+                for i in range(n, len(self.dates)):
+                    if values[i] == values[i]:
+                        changed[self.dates[i]] = values[i]
+            else:
+                for i, date in enumerate(previous.dates):
+                    old = old_values[i]
+                    j = position.get(date)
+                    new = values[j] if j is not None else NAN
+                    if old != new and (old == old or new == new):
+                        changed[date] = new if new == new else None
+                old_dates = set(previous.dates)
+                for j, date in enumerate(self.dates):
+                    if date not in old_dates and values[j] == values[j]:
+                        changed[date] = values[j]
+            if changed:
+                changes[station_id] = changed
+        return changes
+
+    def prefix(self, station_id):
+        """Кумулятивні суми та кількості днів з даними станції: (sums, counts), довжина n + 1"""
+        return self._prefix[station_id]
+
+    def station_ids(self):
+        """Список ID станцій у порядку завантаження"""
+        return list(self.series)
+
+    def date_slice(self, start_date=None, end_date=None):
+        """Повертає межі індексів [lo, hi) для періоду (бінарний пошук по осі дат)"""
+        start_str = to_date_str(start_date)
+        end_str = to_date_str(end_date)
+        lo = bisect_left(self.dates, start_str) if start_str else 0
+        hi = bisect_right(self.dates, end_str) if end_str else len(self.dates)
+        return lo, max(lo, hi)
+
+    def date_range(self):
+        """Мінімальна та максимальна дата з даними (або None, якщо даних немає)"""
+        if not self.dates:
+            return None
+        return self.dates[0], self.dates[-1]
+
+    def to_records(self, station_ids=None, start_date=None, end_date=None):
+        """
+        Повертає дані у форматі API: {station_id: [{'date', 'production_kwh'}, ...]}
+        Фільтр по датах застосовується лише коли вказані обидві межі
+        """
+        if start_date and end_date:
+            lo, hi = self.date_slice(start_date, end_date)
+        else:
+            lo, hi = 0, len(self.dates)
+
+        if station_ids:
+            selected = [sid for sid in station_ids if sid in self.series]
+        else:
+            selected = self.series
+
+        dates = self.dates[lo:hi]
+        result = {}
+        for station_id in selected:
+            values = self.series[station_id][lo:hi]
+            result[station_id] = [
+                {'date': date, 'production_kwh': production}
+                for date, production in zip(dates, values)
+                if production == production  # NaN != NaN - пропускаємо дні без даних
+            ]
+
+        return result
+
+    def to_columns(self, station_ids=None, start_date=None, end_date=None):
+        """
+        Компактний (колонковий) вигляд to_records: (dates, {station_id: [значення або None]})
+        Вісь містить лише дати, для яких є дані хоча б однієї з вибраних станцій
+        """
+        if start_date and end_date:
+            lo, hi = self.date_slice(start_date, end_date)
+        else:
+            lo, hi = 0, len(self.dates)
+
+        if station_ids:
+            selected = [sid for sid in station_ids if sid in self.series]
+        else:
+            selected = list(self.series)
+
+        columns = {
+            station_id: [value if value == value else None for value in self.series[station_id][lo:hi]]
+            for station_id in selected
+        }
+        dates = self.dates[lo:hi]
+
+        # Дні без даних жодної станції не потрапляють на вісь (як у to_records)
+        filled = [0] * (hi - lo)
+        for station_id in selected:
+            counts = self._prefix[station_id][1]
+            filled = [f + counts[lo + i + 1] - counts[lo + i] for i, f in enumerate(filled)]
+        if not all(filled):
+            keep = [i for i, f in enumerate(filled) if f]
+            dates = [dates[i] for i in keep]
+            columns = {station_id: [values[i] for i in keep] for station_id, values in columns.items()}
+
+        return dates, columns
+
+    def iter_records(self, station_id, start_date=None, end_date=None):
+        """Генератор (date, production_kwh) для однієї станції за період без днів з пропусками"""
+        lo, hi = self.date_slice(start_date, end_date)
+        values = self.series.get(station_id)
+        if values is None:
+            return
+        for i in range(lo, hi):
+            production = values[i]
+            if production == production:
+                yield self.dates[i], production
+
+    def _group(self, station_ids):
+        """Кумулятивні суми для групи станцій (кешуються до наступної синхронізації)"""
+        key = tuple(sid for sid in station_ids if sid in self._prefix)
+        if len(key) == 1:
+            return self._prefix[key[0]]
+        if key not in self._group_prefix:
+            n = len(self.dates) + 1
+            if key:
+                sums = array('d', map(sum, zip(*(self._prefix[sid][0] for sid in key))))
+                counts = array('q', map(sum, zip(*(self._prefix[sid][1] for sid in key))))
+            else:
+                sums, counts = array('d', [0.0]) * n, array('q', [0]) * n
+            self._group_prefix[key] = (sums, counts)
+        return self._group_prefix[key]
+
+    def total(self, station_ids, start_date=None, end_date=None):
+        """
+        Сума виробітку групи станцій за період
+        Повертає (total_kwh, station_days), де station_days - кількість
+        пар (станція, день), для яких є дані
+        """
+        lo, hi = self.date_slice(start_date, end_date)
+        sums, counts = self._group(station_ids)
+        return sums[hi] - sums[lo], counts[hi] - counts[lo]
+
+    def bucket_starts(self, bucket):
+        """Ключі інтервалів та індекси їх перших дат на осі дат: (keys, starts)"""
+        if bucket not in self._bucket_starts:
+            keys, starts = [], []
+            for i, date in enumerate(self.dates):
+                key = bucket_key(date, bucket)
+                if not keys or key != keys[-1]:
+                    keys.append(key)
+                    starts.append(i)
+            self._bucket_starts[bucket] = (keys, starts)
+        return self._bucket_starts[bucket]
+
+    def bucket_totals(self, station_ids, bucket, start_date=None, end_date=None):
+        """
+        Суми виробітку групи станцій по інтервалах (day/week/month/year) у межах періоду
+        Повертає список (ключ, lo, hi, total_kwh, station_days)
+        """
+        lo, hi = self.date_slice(start_date, end_date)
+        if lo >= hi:
+            return []
+        sums, counts = self._group(station_ids)
+        keys, starts = self.bucket_starts(bucket)
+
+        result = []
+        # Перший інтервал, що перетинає період
+        n = bisect_right(starts, lo) - 1
+        while n < len(starts) and starts[n] < hi:
+            b_lo = max(starts[n], lo)
+            b_hi = min(starts[n + 1] if n + 1 < len(starts) else len(self.dates), hi)
+            result.append((keys[n], b_lo, b_hi, sums[b_hi] - sums[b_lo], counts[b_hi] - counts[b_lo]))
+            n += 1
+        return result
+
+    def resample(self, station_ids, bucket, start_date=None, end_date=None):
+        """
+        Дані у форматі API, агреговані по інтервалах (week/month/...):
+        дата - перший день інтервалу в періоді, production_kwh - сума за інтервал
+        """
+        result = {}
+        for station_id in station_ids or self.station_ids():
+            if station_id not in self.series:
+                continue
+            result[station_id] = [
+                {'date': self.dates[lo], 'production_kwh': round(total_kwh, 2)}
+                for _, lo, _, total_kwh, days in self.bucket_totals([station_id], bucket, start_date, end_date)
+                if days
+            ]
+        return result
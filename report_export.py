@@ -0,0 +1,149 @@
+"""
+Формування звітів виробітку (CSV та Excel) з потоковою віддачею
+Рядки генеруються по одному прямо зі сховища, тому пам'ять не залежить
+від кількості станцій та довжини періоду
+"""
+import codecs
+import csv
+import io
+import os
+import tempfile
+
+# Кількість рядків CSV, що відправляються одним фрагментом
+CSV_CHUNK_ROWS = 500
+
+# Розмір фрагмента при віддачі XLSX файлу
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Заборонені символи в назвах аркушів Excel
+_SHEET_NAME_FORBIDDEN = str.maketrans({c: ' ' for c in '[]:*?/\\'})
+
+
+def _report_stations(store, stations, station_ids):
+    """Вибрані станції, для яких є і метадані, і дані виробітку (у порядку запиту)"""
+    station_map = {s['station_id']: s for s in stations}
+    return [
+        station_map[station_id] for station_id in station_ids
+        if station_id in station_map and station_id in store.series
+    ]
+
+
+def iter_report_rows(store, stations, station_ids, start_date, end_date):
+    """Генератор рядків звіту у форматі попереднього CSV експорту"""
+    yield ['Звіт виробітку сонячних електростанцій']
+    yield [f'Період: {start_date.strftime("%d.%m.%Y")} - {end_date.strftime("%d.%m.%Y")}']
+    yield []
+
+    for station in _report_stations(store, stations, station_ids):
+        station_id = station['station_id']
+
+        # Дані станції
+        yield [f'{station["station_name"]} - {station["location"]}']
+        yield ['Потужність (кВт)', station['total_capacity_kw']]
+        yield []
+
+        # Таблиця даних
+        yield ['Дата', 'Виробництво (кВт·год)']
+        for date, production in store.iter_records(station_id, start_date, end_date):
+            yield [date, production]
+
+        total_kwh, _ = store.total([station_id], start_date, end_date)
+        yield ['ЗАГАЛОМ:', round(total_kwh, 2)]
+        yield []
+        yield []
+
+
+def stream_csv(rows):
+    """Перетворює рядки на потік байтів CSV (UTF-8 з BOM для Excel)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    yield codecs.BOM_UTF8
+
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _sheet_title(station, used_titles):
+    """Унікальна назва аркуша (Excel: до 31 символу, без []:*?/\\)"""
+    base = f'{station["station_id"]} {station["station_name"]}'.translate(_SHEET_NAME_FORBIDDEN)[:31]
+    title, n = base, 2
+    while title.lower() in used_titles:
+        suffix = f' ({n})'
+        title = base[:31 - len(suffix)] + suffix
+        n += 1
+    used_titles.add(title.lower())
+    return title
+
+
+def write_xlsx_report(store, stations, station_ids, start_date, end_date):
+    """
+    Записує звіт у тимчасовий .xlsx файл і повертає шлях до нього
+    Аркуш "Зведення" + окремий аркуш на кожну станцію; openpyxl у режимі
+    write_only пише рядки одразу на диск, не тримаючи книгу в пам'яті
+    """
+    from openpyxl import Workbook
+
+    report_stations = _report_stations(store, stations, station_ids)
+    period = f'Період: {start_date.strftime("%d.%m.%Y")} - {end_date.strftime("%d.%m.%Y")}'
+
+    workbook = Workbook(write_only=True)
+
+    # Зведення по всіх станціях (суми з кумулятивних сум сховища)
+    summary = workbook.create_sheet('Зведення')
+    summary.append(['Звіт виробітку сонячних електростанцій'])
+    summary.append([period])
+    summary.append([])
+    summary.append(['ID', 'Станція', 'Розташування', 'Потужність (кВт)', 'Днів з даними', 'Виробництво (кВт·год)'])
+    for station in report_stations:
+        total_kwh, days = store.total([station['station_id']], start_date, end_date)
+        summary.append([
+            station['station_id'], station['station_name'], station['location'],
+            station['total_capacity_kw'], days, round(total_kwh, 2)
+        ])
+
+    # Аркуш на кожну станцію
+    used_titles = {'зведення'}
+    for station in report_stations:
+        sheet = workbook.create_sheet(_sheet_title(station, used_titles))
+        sheet.append([f'{station["station_name"]} - {station["location"]}'])
+        sheet.append(['Потужність (кВт)', station['total_capacity_kw']])
+        sheet.append([])
+        sheet.append(['Дата', 'Виробництво (кВт·год)'])
+        for date, production in store.iter_records(station['station_id'], start_date, end_date):
+            sheet.append([date, production])
+        total_kwh, _ = store.total([station['station_id']], start_date, end_date)
+        sheet.append(['ЗАГАЛОМ:', round(total_kwh, 2)])
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    workbook.save(path)
+    return path
+
+
+def stream_file(path):
+    """Віддає файл фрагментами"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def remove_file(path):
+    """
+    Видаляє тимчасовий файл звіту (реєструється через response.call_on_close, тож
+    спрацьовує і для HEAD, і для перерваних завантажень, коли генератор не дочитано)
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,125 @@
+"""
+Кеш серіалізованих JSON відповідей з умовними запитами та стисненням
+Відповідь кешується за ключем (шлях, параметри, версія даних) і віддається
+з ETag / Last-Modified; якщо клієнт вже має цю версію - повертається 304.
+Великі відповіді стискаються gzip (або brotli, якщо встановлено пакет brotli).
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from metrics import CACHE_REQUESTS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Кількість відповідей у кеші (LRU)
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+
+# Мінімальний розмір відповіді для стиснення, байт
+COMPRESS_MIN_SIZE = 1024
+
+
+class ResponseCache:
+    """Потокобезпечний LRU кеш готових відповідей"""
+
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _build_entry(response, version):
+    """Готує запис кешу: тіло, стиснені варіанти та ETag"""
+    body = response.get_data()
+    entry = {
+        'body': body,
+        'mimetype': response.mimetype,
+        'etag': f'{version}-{hashlib.blake2b(body, digest_size=6).hexdigest()}',
+        'gzip': None,
+        'br': None
+    }
+    if len(body) >= COMPRESS_MIN_SIZE:
+        entry['gzip'] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            entry['br'] = brotli.compress(body, quality=5)
+    return entry
+
+
+def _choose_encoding(entry):
+    """Найкраще кодування, яке приймає клієнт"""
+    accepted = request.accept_encodings
+    if entry['br'] is not None and accepted['br']:
+        return 'br'
+    if entry['gzip'] is not None and accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def cached_response(get_version, key_extra=None):
+    """
+    Декоратор для JSON ендпоінтів
+    get_version() -> (версія даних, час синхронізації як unix timestamp)
+    key_extra() -> додаткова частина ключа для того, що залежить не лише від параметрів
+    запиту (наприклад, період за замовчуванням від поточної дати)
+    Кешуються лише успішні (200) відповіді
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, synced_at = get_version()
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), version)
+            if key_extra is not None:
+                key += (key_extra(),)
+
+            entry = response_cache.get(key)
+            CACHE_REQUESTS.inc(cache='response', result='miss' if entry is None else 'hit')
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = _build_entry(response, version)
+                response_cache.put(key, entry)
+
+            encoding = _choose_encoding(entry)
+            response = Response(entry[encoding] if encoding else entry['body'], mimetype=entry['mimetype'])
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            response.set_etag(entry['etag'], weak=True)
+            response.last_modified = datetime.fromtimestamp(synced_at, timezone.utc)
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
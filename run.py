@@ -3,11 +3,15 @@
 """
 from app import app
 import os
+import scheduler
 
 if __name__ == '__main__':
     # для Render
     port = int(os.environ.get('PORT', 5000))
     
+    # Фонове оновлення даних, прогрів кешу та keep-alive пінги
+    scheduler.start(app)
+    
     # Запуск додатку
     app.run(
         host='0.0.0.0',
@@ -0,0 +1,186 @@
+"""
+Фоновий планувальник задач процесу
+  - оновлення знімка даних кожні SCHEDULER_REFRESH_INTERVAL секунд і одразу після
+    нього - прогрів кешу відповідей для типових переглядів (статистика, діапазон дат,
+    список станцій, графіки всіх станцій за WARM_PERIODS днів). Запити виконуються
+    через app.test_client() з тими самими параметрами, що й у charts.js, тому
+    потрапляють у ті самі ключі кешу, що й запити браузера;
+  - keep-alive пінги KEEPALIVE_URL з випадковим зсувом інтервалу та тайм-аутом
+    (щоб хостинг не присипляв інстанс).
+Стан останнього запуску кожної задачі - status() (ендпоінт /api/scheduler/status).
+Потоки задач не переживають fork, тому в дочірньому процесі (воркер gunicorn з --preload)
+планувальник, запущений у батьківському, стартує заново автоматично.
+"""
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+import data_parser
+
+# Інтервал оновлення знімка та прогріву кешу, секунд (0 - вимкнено)
+SCHEDULER_REFRESH_INTERVAL = int(os.getenv('SCHEDULER_REFRESH_INTERVAL', str(data_parser.CACHE_TTL)))
+
+# Періоди графіків (днів від останньої дати), що прогріваються для всіх станцій
+WARM_PERIODS = tuple(int(days) for days in os.getenv('WARM_PERIODS', '7,30,90,365').split(',') if days.strip())
+
+# Має збігатися з MAX_CHART_POINTS у assets/scripts/charts.js
+WARM_MAX_POINTS = 400
+
+# Адреса для keep-alive пінгів (за замовчуванням - зовнішня адреса сервісу на Render)
+KEEPALIVE_URL = os.getenv('KEEPALIVE_URL') or (
+    os.getenv('RENDER_EXTERNAL_URL', '').rstrip('/') + '/api/scheduler/status' if os.getenv('RENDER_EXTERNAL_URL') else ''
+)
+
+# Інтервал пінгів, випадковий зсув (±) та тайм-аут запиту, секунд
+KEEPALIVE_INTERVAL = int(os.getenv('KEEPALIVE_INTERVAL', '300'))
+KEEPALIVE_JITTER = int(os.getenv('KEEPALIVE_JITTER', '60'))
+KEEPALIVE_TIMEOUT = int(os.getenv('KEEPALIVE_TIMEOUT', '10'))
+
+_lock = threading.Lock()
+_app = None
+_started_pid = None
+_started_at = None
+
+# Стан задач: {назва: {'interval', 'runs', 'failures', 'last_started_at', 'last_finished_at',
+#                      'last_duration_ms', 'last_status', 'last_error', 'last_result', 'next_run_at'}}
+_jobs = {}
+
+
+def _chart_resolution(start, end):
+    """Інтервал агрегації, який обере chooseResolution() у charts.js"""
+    days = (end - start).days + 1
+    if days <= WARM_MAX_POINTS:
+        return 'day'
+    if days / 7 <= WARM_MAX_POINTS:
+        return 'week'
+    return 'month'
+
+
+def warm_urls():
+    """Адреси запитів, які сторінки надсилають при відкритті (для поточного знімка)"""
+    date_range = data_parser.get_available_date_range()
+    min_date = date.fromisoformat(date_range['min_date'])
+    max_date = date.fromisoformat(date_range['max_date'])
+    stations = ','.join(station['station_id'] for station in data_parser.get_all_stations())
+
+    urls = ['/api/statistics', '/api/date-range', '/api/stations']
+    for days in WARM_PERIODS:
+        start = max(max_date - timedelta(days=days - 1), min_date)
+        urls.append(
+            f'/api/production?stations={stations}&start_date={start}&end_date={max_date}'
+            f'&resolution={_chart_resolution(start, max_date)}&max_points={WARM_MAX_POINTS}&format=columnar'
+        )
+    return urls
+
+
+def warm_cache(app):
+    """Виконує типові запити, щоб їх відповіді опинились у кеші; повертає кількість запитів"""
+    client = app.test_client()
+    urls = warm_urls()
+    for url in urls:
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        if response.status_code != 200:
+            raise RuntimeError(f'{url.split("?")[0]}: HTTP {response.status_code}')
+    return len(urls)
+
+
+def _refresh_and_warm(app):
+    snapshot = data_parser.refresh_snapshot()
+    warmed = warm_cache(app)
+    return {'version': snapshot['version'], 'source': snapshot['source'], 'warmed_requests': warmed}
+
+
+def _keepalive():
+    import requests
+
+    response = requests.get(KEEPALIVE_URL, timeout=KEEPALIVE_TIMEOUT)
+    return {'status_code': response.status_code}
+
+
+def _run_job(name, func, interval, jitter=0, delay=0.0):
+    """Цикл задачі: запуск, запис стану, очікування interval ± jitter секунд"""
+    state = _jobs[name]
+    wait = delay
+    while True:
+        time.sleep(wait)
+        state['last_started_at'] = time.time()
+        started = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            state.update(last_status='error', last_error=str(e), failures=state['failures'] + 1)
+            print(f"⚠ Планувальник [{name}]: {e}")
+        else:
+            state.update(last_status='ok', last_error=None, last_result=result)
+        state['runs'] += 1
+        state['last_finished_at'] = time.time()
+        state['last_duration_ms'] = round((time.perf_counter() - started) * 1000)
+
+        wait = max(interval + random.uniform(-jitter, jitter), 1.0)
+        state['next_run_at'] = time.time() + wait
+
+
+def _add_job(name, func, interval, jitter=0, delay=0.0):
+    _jobs[name] = {
+        'interval': interval,
+        'runs': 0,
+        'failures': 0,
+        'last_started_at': None,
+        'last_finished_at': None,
+        'last_duration_ms': None,
+        'last_status': None,
+        'last_error': None,
+        'last_result': None,
+        'next_run_at': time.time() + delay
+    }
+    threading.Thread(
+        target=_run_job, args=(name, func, interval, jitter, delay), name=f'scheduler-{name}', daemon=True
+    ).start()
+
+
+def start(app):
+    """
+    Запускає задачі планувальника (один раз на процес; дочірні процеси після fork
+    запускають їх самі - див. _restart_after_fork)
+    Оновлення знімка виконується одразу, пінги - з випадковою затримкою,
+    щоб воркери не надсилали їх одночасно
+    """
+    global _app, _started_pid, _started_at
+    with _lock:
+        if _started_pid == os.getpid():
+            return
+        _app = app
+        _started_pid = os.getpid()
+        _started_at = time.time()
+        _jobs.clear()
+
+        if SCHEDULER_REFRESH_INTERVAL > 0:
+            _add_job('refresh', lambda: _refresh_and_warm(app), SCHEDULER_REFRESH_INTERVAL, jitter=SCHEDULER_REFRESH_INTERVAL * 0.05)
+        if KEEPALIVE_URL and KEEPALIVE_INTERVAL > 0:
+            _add_job('keepalive', _keepalive, KEEPALIVE_INTERVAL, KEEPALIVE_JITTER, delay=random.uniform(0, KEEPALIVE_JITTER))
+    print(f"✓ Запущено планувальник: {', '.join(_jobs) or 'немає задач'}")
+
+
+def _restart_after_fork():
+    """Перезапуск задач у дочірньому процесі, якщо планувальник працював у батьківському"""
+    global _lock
+    # Блокування могло бути захоплене іншим потоком батьківського процесу в момент fork
+    _lock = threading.Lock()
+    if _app is not None:
+        start(_app)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def status():
+    """Стан планувальника та останнього запуску кожної задачі"""
+    return {
+        'running': _started_pid == os.getpid(),
+        'started_at': _started_at if _started_pid == os.getpid() else None,
+        'keepalive_url': KEEPALIVE_URL or None,
+        'jobs': {name: dict(state) for name, state in _jobs.items()}
+    }
@@ -0,0 +1,158 @@
+"""
+Клієнт Google Sheets API
+Сервіс будується один раз на процес, HTTP-з'єднання перевикористовуються,
+а всі потрібні діапазони читаються одним запитом batchGet.
+Бібліотеки Google імпортуються лише при першому запиті, щоб не сповільнювати
+запуск воркерів (і не завантажувати їх зовсім, якщо працюємо на резервних даних)
+"""
+import os
+import threading
+import time
+
+from metrics import SHEETS_ERRORS, SHEETS_LATENCY, SHEETS_REQUESTS
+
+# Налаштування (читаються зі змінних середовища при створенні клієнта):
+# SHEETS_API_ENDPOINT - адреса API; для локального тестового сервера
+#                       (fake_sheets_server.py), наприклад http://127.0.0.1:8765/
+# SHEETS_RETRIES      - кількість повторів при 5xx/429/мережевих помилках
+#                       (з експоненційною затримкою)
+# SHEETS_TIMEOUT      - тайм-аут одного HTTP запиту, секунд
+
+
+def column_letters(index):
+    """Індекс колонки (від 0) у літери A1-нотації: 0 -> 'A', 26 -> 'AA'"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+class SheetsError(Exception):
+    """Помилка звернення до Google Sheets API"""
+
+
+class SheetsClient:
+    """
+    Довгоживучий клієнт Google Sheets.
+    Документ discovery обробляється один раз при першому зверненні;
+    кожен потік має власний httplib2.Http (він не потокобезпечний),
+    який тримає keep-alive з'єднання між запитами.
+    """
+
+    def __init__(self, api_key, endpoint=None, retries=3, timeout=30):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.retries = retries
+        self.timeout = timeout
+        self._service = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_service(self):
+        """Будує сервіс Sheets v4 один раз (вбудований discovery документ, без мережі)"""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    from googleapiclient.discovery import build
+
+                    client_options = {'api_endpoint': self.endpoint} if self.endpoint else None
+                    self._service = build(
+                        'sheets', 'v4',
+                        developerKey=self.api_key,
+                        static_discovery=True,
+                        cache_discovery=False,
+                        client_options=client_options
+                    )
+        return self._service
+
+    def _get_http(self):
+        """HTTP з'єднання поточного потоку"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            import httplib2
+            http = httplib2.Http(timeout=self.timeout)
+            self._local.http = http
+        return http
+
+    def _execute(self, request):
+        """Виконує запит з повторами; помилки API перетворюються на SheetsError"""
+        import httplib2
+        from googleapiclient.errors import HttpError
+
+        method = getattr(request, 'methodId', '').partition('sheets.')[2] or 'unknown'
+        SHEETS_REQUESTS.inc(method=method)
+        started = time.perf_counter()
+        try:
+            return request.execute(http=self._get_http(), num_retries=self.retries)
+        except HttpError as e:
+            SHEETS_ERRORS.inc(method=method)
+            # Без URL запиту: він містить ключ API, а текст помилки показується в /api/sources
+            raise SheetsError(f'Помилка API: {e.resp.status} {e.reason}') from e
+        except (OSError, httplib2.HttpLib2Error) as e:
+            SHEETS_ERRORS.inc(method=method)
+            raise SheetsError(f'Помилка з\'єднання: {e}') from e
+        finally:
+            SHEETS_LATENCY.observe(time.perf_counter() - started, method=method)
+
+    def batch_get(self, spreadsheet_id, ranges):
+        """
+        Читає кілька діапазонів одним запитом
+        Повертає список значень (список рядків) у порядку ranges
+        """
+        request = self._get_service().spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=list(ranges)
+        )
+        result = self._execute(request)
+        return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+    def get_grid_size(self, spreadsheet_id, sheet_title):
+        """Реальний розмір листа: (кількість рядків, кількість колонок)"""
+        request = self._get_service().spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            ranges=[f"'{sheet_title}'"],
+            fields='sheets(properties(title,gridProperties(rowCount,columnCount)))'
+        )
+        result = self._execute(request)
+        for sheet in result.get('sheets', []):
+            properties = sheet.get('properties', {})
+            if properties.get('title') == sheet_title:
+                grid = properties.get('gridProperties', {})
+                return grid.get('rowCount', 0), grid.get('columnCount', 0)
+        raise SheetsError(f'Лист не знайдено: {sheet_title}')
+
+    def get_values(self, spreadsheet_id, range_name):
+        """Читає один діапазон"""
+        return self.batch_get(spreadsheet_id, [range_name])[0]
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """Після fork клієнти (та їх з'єднання) батьківського процесу не використовуються"""
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_client(api_key):
+    """Повертає спільний для процесу клієнт для ключа API"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = SheetsClient(
+                api_key,
+                endpoint=os.getenv('SHEETS_API_ENDPOINT'),
+                retries=int(os.getenv('SHEETS_RETRIES', '3')),
+                timeout=int(os.getenv('SHEETS_TIMEOUT', '30'))
+            )
+            _clients[api_key] = client
+        return client
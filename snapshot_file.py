@@ -0,0 +1,110 @@
+"""
+Збереження знімка даних на диск для швидкого холодного старту
+Формат файлу:
+    b'TSMSNAP1' | довжина заголовка (uint32) | заголовок JSON | вирівнювання до 8 байт |
+    для кожної станції: значення (float64 x n), кумулятивні суми (float64 x n+1),
+                        кількості днів з даними (int64 x n+1)
+Файл відкривається через mmap: масиви станцій - це memoryview без копіювання,
+тому завантаження займає мілісекунди незалежно від обсягу історії
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from production_store import ProductionStore
+
+MAGIC = b'TSMSNAP1'
+FORMAT_VERSION = 3
+_HEADER_LEN = struct.Struct('<I')
+
+
+def save_snapshot(path, snapshot):
+    """Атомарно записує знімок у файл (через тимчасовий файл і os.replace)"""
+    store = snapshot['store']
+    station_ids = store.station_ids()
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'source': snapshot['source'],
+        'version': snapshot['version'],
+        'synced_at': snapshot['synced_at'],
+        'sync': snapshot['sync'],
+        'sources': snapshot.get('sources', []),
+        'conflicts': snapshot.get('conflicts', []),
+        'stations': snapshot['stations'],
+        'station_ids': station_ids,
+        'dates': store.dates
+    }, ensure_ascii=False).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            f.write(b'\0' * (-f.tell() % 8))
+            for station_id in station_ids:
+                sums, counts = store.prefix(station_id)
+                for values in (store.series[station_id], sums, counts):
+                    f.write(memoryview(values).cast('B'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_snapshot(path):
+    """
+    Відкриває знімок з диска; повертає словник знімка або None,
+    якщо файла немає чи він пошкоджений / іншого формату
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        view = memoryview(mapped)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            return None
+        offset = len(MAGIC)
+        (header_len,) = _HEADER_LEN.unpack_from(view, offset)
+        offset += _HEADER_LEN.size
+        header = json.loads(bytes(view[offset:offset + header_len]).decode('utf-8'))
+        if header.get('format_version') != FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+            return None
+        offset += header_len
+        offset += -offset % 8
+
+        n = len(header['dates'])
+        series, prefix = {}, {}
+        for station_id in header['station_ids']:
+            values = view[offset:offset + n * 8].cast('d')
+            offset += n * 8
+            sums = view[offset:offset + (n + 1) * 8].cast('d')
+            offset += (n + 1) * 8
+            counts = view[offset:offset + (n + 1) * 8].cast('q')
+            offset += (n + 1) * 8
+            series[station_id] = values
+            prefix[station_id] = (sums, counts)
+        if offset > len(view):
+            return None
+    except (ValueError, KeyError, TypeError, struct.error):
+        return None
+
+    return {
+        'stations': header['stations'],
+        'store': ProductionStore(header['dates'], series, prefix),
+        'sync': header['sync'],
+        'source': header['source'],
+        'sources': header['sources'],
+        'conflicts': header['conflicts'],
+        'version': header['version'],
+        'synced_at': header['synced_at']
+    }
@@ -0,0 +1,179 @@
+"""
+Реєстр станцій з індексами, що будується один раз на синхронізацію
+  - пошук за ID за O(1);
+  - вторинні індекси за парою, розташуванням, брендом інвертора та системою моніторингу;
+  - заздалегідь розрахована загальна статистика;
+  - просторова сітка за широтою/довготою для запитів у прямокутнику
+    та пошуку N найближчих станцій.
+"""
+import math
+import os
+
+# Поля з вторинними індексами (параметри фільтра /api/stations)
+INDEXED_FIELDS = ('station_pair', 'location', 'inverter_brand', 'monitoring_system')
+
+# Розмір клітинки просторової сітки, градусів
+GEO_CELL_DEGREES = float(os.getenv('GEO_CELL_DEGREES', '0.5'))
+
+# Середній радіус Землі та довжина градуса меридіана, км
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Відстань по великому колу (формула гаверсинусів), км"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class StationRegistry:
+    """
+    Незмінний набір станцій з індексами
+    stations - список словників станцій у порядку таблиці
+    """
+
+    def __init__(self, stations, cell_degrees=GEO_CELL_DEGREES):
+        self.stations = stations
+        self.cell_degrees = cell_degrees
+        self._by_id = {}
+        self._order = {}
+        self._indexes = {field: {} for field in INDEXED_FIELDS}
+        self._grid = {}
+
+        for position, station in enumerate(stations):
+            station_id = station['station_id']
+            self._by_id[station_id] = station
+            self._order[station_id] = position
+            for field in INDEXED_FIELDS:
+                self._indexes[field].setdefault(station.get(field, ''), []).append(station_id)
+            self._grid.setdefault(self._cell(station['latitude'], station['longitude']), []).append(station_id)
+
+        # Найбільша |широта| та межі довготи - для нижньої межі відстані по довготі при пошуку найближчих
+        self._max_abs_lat = max((abs(s['latitude']) for s in stations), default=0.0)
+        self._lon_range = (
+            min((s['longitude'] for s in stations), default=0.0),
+            max((s['longitude'] for s in stations), default=0.0)
+        )
+
+        self.statistics = {
+            'total_stations': len(stations),
+            'total_capacity_kw': sum(s['total_capacity_kw'] for s in stations),
+            'total_locations': len(self._indexes['location']),
+            'total_monitoring_systems': len(self._indexes['monitoring_system'])
+        }
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def get(self, station_id):
+        """Станція за ID або None"""
+        return self._by_id.get(station_id)
+
+    def values(self, field):
+        """Значення індексованого поля: {значення: кількість станцій}"""
+        return {value: len(ids) for value, ids in self._indexes[field].items()}
+
+    def filter(self, station_ids=None, **criteria):
+        """
+        Станції, що відповідають усім умовам (у порядку таблиці)
+        criteria - поле з INDEXED_FIELDS -> список допустимих значень (будь-яке з них)
+        station_ids - обмежити вибір цими ID
+        """
+        selected = set(self._by_id) if station_ids is None else set(station_ids) & self._by_id.keys()
+        for field, values in criteria.items():
+            if field not in self._indexes:
+                raise ValueError(f'Невідоме поле фільтра: {field}')
+            if values:
+                index = self._indexes[field]
+                selected &= {station_id for value in values for station_id in index.get(value, ())}
+        return [self._by_id[station_id] for station_id in sorted(selected, key=self._order.__getitem__)]
+
+    def in_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """ID станцій у прямокутнику [min_lat, max_lat] x [min_lon, max_lon]"""
+        if min_lat > max_lat or min_lon > max_lon:
+            raise ValueError('Невірні межі прямокутника')
+
+        lat0, lon0 = self._cell(min_lat, min_lon)
+        lat1, lon1 = self._cell(max_lat, max_lon)
+        if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) > len(self._grid):
+            # Великий прямокутник - перевіряємо лише непорожні клітинки
+            cells = [cell for cell in self._grid if lat0 <= cell[0] <= lat1 and lon0 <= cell[1] <= lon1]
+        else:
+            cells = [(i, j) for i in range(lat0, lat1 + 1) for j in range(lon0, lon1 + 1) if (i, j) in self._grid]
+
+        result = []
+        for cell in cells:
+            for station_id in self._grid[cell]:
+                station = self._by_id[station_id]
+                if min_lat <= station['latitude'] <= max_lat and min_lon <= station['longitude'] <= max_lon:
+                    result.append(station_id)
+        return sorted(result, key=self._order.__getitem__)
+
+    def nearest(self, latitude, longitude, limit=5, max_km=None, station_ids=None):
+        """
+        Найближчі станції: [(station_id, відстань_км), ...] за зростанням відстані
+        Клітинки сітки переглядаються кільцями навколо точки, доки наступне кільце
+        гарантовано не може містити ближчих станцій. Коли кільце стає довшим за кількість
+        непорожніх клітинок, далі перебираються лише непорожні клітинки (згруповані за кільцем),
+        тож віддалена точка не означає перебору всієї порожньої площі
+        station_ids - шукати лише серед цих станцій
+        """
+        if limit < 1 or not self._grid:
+            return []
+        allowed = None if station_ids is None else set(station_ids)
+
+        ci, cj = self._cell(latitude, longitude)
+        # hav(d) >= cos(φ1)·cos(φ2)·hav(Δλ): нижня межа відстані до станції, віддаленої по довготі;
+        # через антимеридіан різниця довгот не більша за 360° мінус найбільшу різницю до станцій
+        lon_factor = math.sqrt(max(math.cos(math.radians(latitude)) * math.cos(math.radians(self._max_abs_lat)), 0.0))
+        max_lon_gap = 360 - max(abs(longitude - self._lon_range[0]), abs(longitude - self._lon_range[1]))
+        found = []
+        occupied = None
+        ring = 0
+        while True:
+            if occupied is None and 8 * ring > len(self._grid):
+                occupied = {}
+                for i, j in self._grid:
+                    cell_ring = max(abs(i - ci), abs(j - cj))
+                    if cell_ring >= ring:
+                        occupied.setdefault(cell_ring, []).append((i, j))
+            if occupied is not None:
+                if not occupied:
+                    break
+                ring = min(occupied)
+                cells = occupied.pop(ring)
+            else:
+                # Периметр квадрата: верхній і нижній ряди повністю, бокові стовпці без кутів
+                edge = [(ci - ring, j) for j in range(cj - ring, cj + ring + 1)]
+                if ring:
+                    edge += [(ci + ring, j) for j in range(cj - ring, cj + ring + 1)]
+                    edge += [(i, cj + side) for i in range(ci - ring + 1, ci + ring) for side in (-ring, ring)]
+                cells = [cell for cell in edge if cell in self._grid]
+
+            for cell in cells:
+                for station_id in self._grid[cell]:
+                    if allowed is not None and station_id not in allowed:
+                        continue
+                    station = self._by_id[station_id]
+                    found.append((distance_km(latitude, longitude, station['latitude'], station['longitude']), station_id))
+
+            # Станції за межами переглянутих кілець не ближчі за ring клітинок
+            lon_degrees = min(ring * self.cell_degrees, max_lon_gap, 180.0)
+            bound = min(
+                ring * self.cell_degrees * KM_PER_DEGREE,
+                2 * EARTH_RADIUS_KM * math.asin(min(1.0, lon_factor * math.sin(math.radians(lon_degrees) / 2)))
+            )
+            if max_km is not None and bound > max_km:
+                break
+            if len(found) >= limit and sorted(found)[limit - 1][0] <= bound:
+                break
+            ring += 1
+
+        found.sort(key=lambda item: (item[0], self._order[item[1]]))
+        return [
+            (station_id, distance) for distance, station_id in found[:limit]
+            if max_km is None or distance <= max_km
+        ]